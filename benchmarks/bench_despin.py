@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+import scipy.integrate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytide
+import pytide.system as system
+import tides
+
+def tides_system(a, w_start, body1, body2):
+    body1 = tides.Body(body1.radius, body1.mass, body1.k_2, body1.Q, body1.alpha)
+    body2 = tides.Body(body2.radius, body2.mass, body2.k_2, body2.Q, body2.alpha)
+    return tides.System(body2, body1, a, start_omega_s=w_start)
+
+def tides_despin(a, w_start, body1, body2):
+    return tides_system(a, w_start, body1, body2).solve('s').despin_time
+
+def tides_despin_event(a, w_start, body1, body2):
+    return tides_system(a, w_start, body1, body2).solve_event('s').despin_time
+
+# method -> (start_a, start_w, body1, body2) -> despin time in years
+METHODS = {
+    'slow': lambda a, w, b1, b2: system.calculated_tidal_despin(a, w, b1, b2, 100)[0][-1],
+    'e': lambda a, w, b1, b2: system.calculated_tidal_despin_e(a, w, b1, b2),
+    'fast': lambda a, w, b1, b2: system.calculated_tidal_despin_fast(a, b1, w - system.keplers_third_law(a, b1, b2)),
+    'event': lambda a, w, b1, b2: system.calculated_tidal_despin_event(a, w, b1, b2)[0][-1],
+    'dp': lambda a, w, b1, b2: system.calculated_tidal_despin_dp(a, w, b1, b2)[0][-1],
+    'quad': lambda a, w, b1, b2: system.calculated_tidal_despin_quad(a, w, b1, b2)[0],
+    'tides_scipy': tides_despin,
+    'tides_event': tides_despin_event,
+}
+
+BATCH_METHODS = {
+    'batch': system.calculated_tidal_despin_batch,
+    'dp_batch': system.calculated_tidal_despin_dp_batch,
+    'quad_batch': system.calculated_tidal_despin_quad_batch,
+}
+
+def catalog_cases():
+    for host_name, satellite_name, despin_body in pytide.catalog.PAIRS:
+        host = getattr(pytide.body, host_name)
+        satellite, a = host.satellites[satellite_name]
+        w_start = 0.000174 + system.keplers_third_law(a, host, satellite)
+        body1, body2 = (satellite, host) if despin_body == 's' else (host, satellite)
+        yield f'{body1.name}-{body2.name}', a, w_start, body1, body2
+
+def reference(a, w_start, body1, body2):
+    return system.calculated_tidal_despin_event(a, w_start, body1, body2, 1e-11, 'DOP853')[0][-1]
+
+def tides_reference(a, w_start, body1, body2, fraction):
+    # tides.py switches the torque with np.sign where pytide uses a steep sigmoid, which alone moves the lock time by
+    # about 1.4%, so its solvers are checked against a tight solve of its own equations. fraction is where each one
+    # calls the body locked: 1/1000 of the spin excess for System.solve, 1/500 for System.solve_event
+    tides_sys = tides_system(a, w_start, body1, body2)
+    lock = (w_start - tides_sys.start_n) / fraction
+
+    def lock_event(xi, y, tides_sys, body):
+        return y[0] - tides.keplers_third_law(y[1], tides_sys.host, tides_sys.satellite) - lock
+    lock_event.terminal = True
+    lock_event.direction = -1
+
+    atol = [1e-11 * abs(w_start - tides_sys.start_n), 1e-11 * a]
+    sol = scipy.integrate.solve_ivp(tides.calculated_tidal_despin_change, [0, 10.0**100], np.array([w_start, a]), args=(tides_sys, 's'),
+                                    events=lock_event, rtol=1e-11, atol=atol, method='DOP853')
+    return sol.t[-1]
+
+# methods that solve a different model are checked against their own reference
+REFERENCES = {
+    'tides_scipy': lambda a, w, b1, b2: tides_reference(a, w, b1, b2, 1000),
+    'tides_event': lambda a, w, b1, b2: tides_reference(a, w, b1, b2, 500),
+}
+
+def best_time(func, repeats):
+    # the first call is untimed so numba compilation is not counted
+    result = func()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def bench_catalog(methods, repeats):
+    results = {}
+    for name, a, w_start, body1, body2 in catalog_cases():
+        expected = reference(a, w_start, body1, body2)
+        results[name] = {}
+        for method in methods:
+            seconds, despin_time = best_time(lambda: METHODS[method](a, w_start, body1, body2), repeats)
+            method_expected = REFERENCES[method](a, w_start, body1, body2) if method in REFERENCES else expected
+            error = abs(despin_time / method_expected - 1)
+            results[name][method] = {'seconds': seconds, 'relative_error': error}
+            print(f'{name:18s} {method:12s} {seconds * 1000:10.3f} ms  error {error:.1E}')
+    return results
+
+def synthetic_batch(size, seed=0):
+    rng = np.random.default_rng(seed)
+    mass2 = 10 ** rng.uniform(23, 30, size)
+    mass1 = mass2 * 10 ** rng.uniform(-8, -2, size)
+    radius = (mass1 / (4 / 3 * np.pi * 3000)) ** (1 / 3)
+    a = radius * 10 ** rng.uniform(1.5, 3, size) * (mass2 / mass1) ** (1 / 3)
+    w_start = 0.000174 + system.keplers_third_law_fast(a, mass1, mass2)
+    return a, w_start, radius, mass1, mass2, 10 ** rng.uniform(-4, -1, size), 10 ** rng.uniform(1, 3, size), rng.uniform(0.3, 0.4, size)
+
+def bench_batches(sizes, repeats):
+    results = {}
+    for size in sizes:
+        arrays = synthetic_batch(size)
+        expected = system.calculated_tidal_despin_dp_batch(*arrays, rtol=1e-11)[0]
+        results[size] = {}
+        for method, func in BATCH_METHODS.items():
+            seconds, (despin_time, *_) = best_time(lambda: func(*arrays), repeats)
+            error = float(np.max(np.abs(despin_time / expected - 1)))
+            results[size][method] = {'seconds': seconds, 'per_system': seconds / size, 'relative_error': error}
+            print(f'{size:8d} {method:12s} {seconds * 1000:10.3f} ms  {seconds / size * 1e6:8.2f} us/system  error {error:.1E}')
+    return results
+
+def compare(results, baseline, slowdown, error_growth):
+    # a regression is a method that got slower by more than slowdown, or less accurate by more than error_growth
+    regressions = []
+    for section in ('catalog', 'batch'):
+        for case, methods in results[section].items():
+            for method, new in methods.items():
+                old = baseline.get(section, {}).get(str(case), {}).get(method)
+                if old is None:
+                    continue
+                if new['seconds'] > old['seconds'] * slowdown:
+                    regressions.append(f'{case} {method}: {old["seconds"]:.3g}s -> {new["seconds"]:.3g}s')
+                if new['relative_error'] is None or old['relative_error'] is None:
+                    continue
+                if new['relative_error'] > max(old['relative_error'] * error_growth, 1e-12):
+                    regressions.append(f'{case} {method}: error {old["relative_error"]:.2g} -> {new["relative_error"]:.2g}')
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='time and check the accuracy of the despin solvers')
+    parser.add_argument('--methods', nargs='+', default=list(METHODS))
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--slowdown', type=float, default=1.5)
+    parser.add_argument('--error-growth', type=float, default=10.0)
+    args = parser.parse_args()
+
+    results = {'catalog': bench_catalog(args.methods, args.repeats), 'batch': bench_batches(args.sizes, args.repeats)}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.loads(json.dumps(results)), json.load(f), args.slowdown, args.error_growth)
+        for regression in regressions:
+            print('regression:', regression)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tide_sim
+import tide_sim_mesh
+import tide_sim_headless
+
+def despin(dtype, args):
+    body = tide_sim.Body()
+    body.dtype = dtype
+    if args.rings:
+        n_nodes = 3 * args.rings * (args.rings + 1) + 1
+        body.nodes_pos, body.springs_nodes, body.springs_s = tide_sim_mesh.triangulated_disk(args.rings, body.r, 0.1 * n_nodes / 81)
+    else:
+        tide_sim.build_disk(body)
+    start = time.perf_counter()
+    tide_sim_headless.run(body, args.fps, args.max_blocks, args.threshold, integrator=args.integrator)
+    return body, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='float32 against float64 engine kernels over a full despin')
+    parser.add_argument('--fps', type=int, default=2**10)
+    parser.add_argument('--max-blocks', type=int)
+    parser.add_argument('--threshold', type=float, default=1.0)
+    parser.add_argument('--integrator', choices=['euler', 'verlet'], default='euler')
+    parser.add_argument('--rings', type=int, help='triangulated disk instead of the legacy mesh')
+    args = parser.parse_args()
+
+    # compile both variants before timing
+    warm = argparse.Namespace(**{**vars(args), 'max_blocks': 1})
+    despin('f8', warm)
+    despin('f4', warm)
+
+    f8, f8_time = despin('f8', args)
+    f4, f4_time = despin('f4', args)
+    print(f'{len(f8.nodes_pos)} nodes, {len(f8.springs_nodes)} springs, {args.integrator}')
+    print(f'f8  {f8_time:8.2f} s  despun after {f8.x[-1]:.0f} substeps')
+    print(f'f4  {f4_time:8.2f} s  despun after {f4.x[-1]:.0f} substeps  speedup {f8_time / f4_time:.2f}x')
+
+    n = min(len(f8.data), len(f4.data))
+    speed8, speed4 = np.array(f8.data[:n]), np.array(f4.data[:n])
+    energy8, energy4 = np.array(f8.energy_data[:n]), np.array(f4.energy_data[:n])
+    print(f'rotational speed  max abs diff {np.max(np.abs(speed4 - speed8)):.3e}  (start {speed8[0]:.3f})')
+    print(f'energy            max rel diff {np.max(np.abs(energy4 - energy8) / energy8):.3e}')
+    print(f'despin time       rel diff {abs(f4.x[-1] - f8.x[-1]) / f8.x[-1]:.3e}')
+
+if __name__ == '__main__':
+    main()
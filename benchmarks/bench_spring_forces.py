@@ -0,0 +1,62 @@
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import numba
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tide_sim_eng as eng
+import tide_sim_parallel
+
+def lattice(n):
+    # n x n square lattice with both diagonals, about 4 n^2 springs
+    index = np.arange(n * n).reshape(n, n)
+    pairs = [(index[:, :-1], index[:, 1:]), (index[:-1, :], index[1:, :]), (index[:-1, :-1], index[1:, 1:]), (index[:-1, 1:], index[1:, :-1])]
+    springs_nodes = np.concatenate([np.stack((a.ravel(), b.ravel()), axis=1) for a, b in pairs]).astype('i4')
+    y, x = np.divmod(np.arange(n * n), n)
+    nodes_pos = np.stack((x, y), axis=1).astype('f8') * 10.0
+    nodes_velocity = np.stack((nodes_pos[:, 1], -nodes_pos[:, 0]), axis=1) / 1000
+    return nodes_pos, nodes_velocity, springs_nodes, np.full(len(springs_nodes), 0.1)
+
+def best_time(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main():
+    parser = argparse.ArgumentParser(description='speedup of parallel spring-force assembly against thread count')
+    parser.add_argument('--size', type=int, default=300, help='lattice side, the mesh has about 4 size^2 springs')
+    parser.add_argument('--substeps', type=int, default=20)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    nodes_pos, nodes_velocity, springs_nodes, springs_s = lattice(args.size)
+    start_length = eng.get_springs_length(nodes_pos, springs_nodes)[0]
+    indptr, springs, signs = tide_sim_parallel.build_incidence(springs_nodes, len(nodes_pos))
+    nodes_forces = eng.make_workspace(len(nodes_pos))
+    springs_forces = np.zeros((len(springs_nodes), 2))
+    print(f'{len(nodes_pos)} nodes, {len(springs_nodes)} springs, {args.substeps} substeps')
+
+    def serial():
+        eng.move_inplace(nodes_pos.copy(), nodes_velocity.copy(), start_length, springs_nodes, springs_s, start_length.copy(), 0.01, 0.5, args.substeps, nodes_forces)
+
+    def parallel():
+        tide_sim_parallel.move_parallel(nodes_pos.copy(), nodes_velocity.copy(), start_length, springs_nodes, springs_s, start_length.copy(), 0.01, 0.5, args.substeps, nodes_forces, springs_forces, indptr, springs, signs)
+
+    serial()
+    parallel()
+    serial_time = best_time(serial, args.repeats)
+    print(f'serial            {serial_time * 1000:9.2f} ms')
+    for threads in range(1, numba.config.NUMBA_NUM_THREADS + 1):
+        numba.set_num_threads(threads)
+        parallel_time = best_time(parallel, args.repeats)
+        print(f'parallel {threads:3d} threads {parallel_time * 1000:9.2f} ms  speedup {serial_time / parallel_time:5.2f}x')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+import sys
+import json
+import subprocess
+import statistics
+
+# each stage runs in a fresh interpreter, as a short-lived worker would
+STAGES = {
+    'import pytide': 'import pytide',
+    'import pytide.system': 'import pytide.system',
+    'build catalog': 'import pytide; pytide.body.mars',
+    'first result': 'import pytide; from pytide import body, system; '
+                    'system.calculated_tidal_despin_dp(9.3e6, 0.0004, body.phobos, body.mars)',
+}
+
+def time_stage(code):
+    timed = f'import time; _start = time.perf_counter(); {code}; print(time.perf_counter() - _start)'
+    out = subprocess.run([sys.executable, '-c', timed], capture_output=True, text=True, check=True)
+    return float(out.stdout.split()[-1])
+
+def main(repeats=5):
+    # the first run fills numba's on-disk cache, later runs load the compiled kernels from it
+    results = {}
+    for name, code in STAGES.items():
+        cold = time_stage(code)
+        warm = [time_stage(code) for _ in range(repeats)]
+        results[name] = {'first': cold, 'median': statistics.median(warm)}
+        print(f'{name:24s} first {cold * 1000:8.1f} ms, cached median {statistics.median(warm) * 1000:8.1f} ms')
+    return results
+
+if __name__ == '__main__':
+    results = main()
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], 'w') as f:
+            json.dump(results, f, indent=2)
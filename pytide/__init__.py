@@ -1,12 +1,17 @@
+import math
+import importlib
 
-import numpy as np
-
-from pytide.body import Body
-import pytide.body as body
-import pytide.system as system
-from pytide.system import G
+_submodules = ('body', 'cache', 'catalog', 'instrument', 'pipeline', 'registry', 'system', 'sweep', 'uncertainty')
 
 def period_to_omega(period):
-    return 2 * np.pi / (period * 24 * 60 * 60)
+    return 2 * math.pi / (period * 24 * 60 * 60)
 
-print('hello')
\ No newline at end of file
+def __getattr__(name):
+    # submodules pull in scipy and numba, so they are only imported on first use
+    if name in _submodules:
+        return importlib.import_module(f'pytide.{name}')
+    if name == 'Body':
+        return importlib.import_module('pytide.body').Body
+    if name == 'G':
+        return importlib.import_module('pytide.system').G
+    raise AttributeError(f"module 'pytide' has no attribute '{name}'")
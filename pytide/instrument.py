@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+
+import pytide.system as system
+
+COUNTERS = ('windows', 'nfev', 'njev', 'nlu', 'steps', 'rejected')
+
+class DespinResult:
+    def __init__(self, name, method):
+        self.name = name
+        self.method = method
+        self.despin_time = np.nan
+        self.final_a = np.nan
+        self.trajectory = None
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.phases = {}
+
+    @property
+    def wall_time(self):
+        return sum(self.phases.values())
+
+    def add(self, counters):
+        self.counters['windows'] += 1
+        for key, value in counters.items():
+            self.counters[key] += value
+
+    def __str__(self):
+        counters = ', '.join(f'{key}={value}' for key, value in self.counters.items())
+        return f'{self.name} [{self.method}] despin={self.despin_time:.2E} wall={self.wall_time * 1000:.2f}ms {counters}'
+
+class DespinStats:
+    def __init__(self, results):
+        self.results = list(results)
+
+    def column(self, key):
+        if key == 'wall_time':
+            return np.array([result.wall_time for result in self.results])
+        if key in COUNTERS:
+            return np.array([result.counters[key] for result in self.results])
+        return np.array([result.phases.get(key, 0.0) for result in self.results])
+
+    def totals(self):
+        return {key: int(self.column(key).sum()) for key in COUNTERS} | {'wall_time': float(self.column('wall_time').sum())}
+
+    def slowest(self, n=5, key='wall_time'):
+        # the pathological systems that dominate a batch
+        order = np.argsort(self.column(key))[::-1]
+        return [self.results[i] for i in order[:n]]
+
+    def __str__(self):
+        wall_time = self.column('wall_time')
+        lines = [f'{len(self.results)} systems, wall {wall_time.sum():.3f}s (mean {wall_time.mean() * 1000:.2f}ms, max {wall_time.max() * 1000:.2f}ms)']
+        lines += [f'  {key}: total {total}' for key, total in self.totals().items() if key != 'wall_time']
+        lines += ['  slowest: ' + str(result) for result in self.slowest(3)]
+        return '\n'.join(lines)
+
+def solve(start_a, start_w, body1, body2, method='event', name=None, callback=None, **settings):
+    # callback(result, phase, counters) is called after every solver window and at the end of each phase
+    result = DespinResult(name or f'{body1.name}, {body2.name}', method)
+
+    def window(counters):
+        result.add(counters)
+        if callback is not None:
+            callback(result, 'window', counters)
+
+    def phase(name, start):
+        result.phases[name] = result.phases.get(name, 0.0) + time.perf_counter() - start
+        if callback is not None:
+            callback(result, name, result.counters)
+
+    start = time.perf_counter()
+    if method == 'slow':
+        t, w, a = system.calculated_tidal_despin(start_a, start_w, body1, body2, settings.get('steps', 100), window)
+    elif method == 'event':
+        t, w, a = system.calculated_tidal_despin_event(start_a, start_w, body1, body2, callback=window, **settings)
+    elif method == 'dp':
+        t, w, a = system.calculated_tidal_despin_dp(start_a, start_w, body1, body2, callback=window, **settings)
+    elif method == 'quad':
+        t, a = [np.array([x]) for x in system.calculated_tidal_despin_quad(start_a, start_w, body1, body2, **settings)]
+        w = None
+    elif method == 'e':
+        t, a, w = np.array([system.calculated_tidal_despin_e(start_a, start_w, body1, body2, **settings)]), np.array([np.nan]), None
+    elif method == 'fast':
+        t, a, w = np.array([system.calculated_tidal_despin_fast(start_a, body1, start_w - system.keplers_third_law(start_a, body1, body2))]), np.array([np.nan]), None
+    else:
+        raise ValueError(f'unknown method {method}')
+    phase('solve', start)
+
+    start = time.perf_counter()
+    result.despin_time = float(t[-1])
+    result.final_a = float(a[-1])
+    if w is not None:
+        result.trajectory = (t, w, a)
+    phase('post', start)
+    return result
+
+def solve_batch(cases, method='event', callback=None, **settings):
+    # cases are (start_a, start_w, body1, body2) tuples
+    return DespinStats(solve(*case, method=method, callback=callback, **settings) for case in cases)
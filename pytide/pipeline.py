@@ -0,0 +1,98 @@
+import csv
+import time
+
+import numpy as np
+
+import pytide.system as system
+
+# pipeline field -> csv column; k_2, Q, alpha and w_start are optional
+COLUMNS = {'host_mass': 'host_mass', 'host_radius': 'host_radius', 'planet_mass': 'planet_mass', 'planet_radius': 'planet_radius',
+           'a': 'a', 'k_2': 'k_2', 'Q': 'Q', 'alpha': 'alpha', 'w_start': 'w_start'}
+# same defaults as Body.__init__ and Body.get_despin_time
+DEFAULTS = {'k_2': 0.1, 'Q': 100.0, 'alpha': 0.4, 'w_start': 0.000174}
+
+def _float(text):
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+def _column(rows, i):
+    if i is None:
+        return np.full(len(rows), np.nan)
+    values = np.array([row[i] for row in rows])
+    try:
+        return np.where(np.char.strip(values) == '', 'nan', values).astype(np.float64)
+    except ValueError:
+        # placeholders like NA, -- or null become nan just like empty cells, so the row is defaulted or marked invalid
+        return np.array([_float(value) for value in values], dtype=np.float64)
+
+def read_header(file):
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        raise ValueError('the input has no header row')
+    return reader, header
+
+def _chunks(reader, header, chunk_size, columns):
+    columns = dict(COLUMNS, **(columns or {}))
+    positions = {field: header.index(name) if name in header else None for field, name in columns.items()}
+
+    rows = []
+    for row in reader:
+        if len(row) < len(header):
+            # missing trailing cells are read as empty, like NA
+            row = row + [''] * (len(header) - len(row))
+        rows.append(row)
+        if len(rows) == chunk_size:
+            yield rows, {field: _column(rows, i) for field, i in positions.items()}
+            rows = []
+    if rows:
+        yield rows, {field: _column(rows, i) for field, i in positions.items()}
+
+def read_chunks(file, chunk_size=100000, columns=None):
+    reader, header = read_header(file)
+    for rows, values in _chunks(reader, header, chunk_size, columns):
+        yield header, rows, values
+
+def despin_chunk(values, despin_body='s', rtol=1e-6):
+    for field, default in DEFAULTS.items():
+        values[field] = np.where(np.isnan(values[field]), default, values[field])
+
+    if despin_body == 's':
+        radius, mass1, mass2 = values['planet_radius'], values['planet_mass'], values['host_mass']
+    else:
+        radius, mass1, mass2 = values['host_radius'], values['host_mass'], values['planet_mass']
+
+    # rows with missing or unphysical inputs get nan instead of a lock time
+    valid = (values['a'] > 0) & (radius > 0) & (mass1 > 0) & (mass2 > 0)
+    a = np.where(valid, values['a'], 1.0)
+    radius = np.where(valid, radius, 1.0)
+    mass1 = np.where(valid, mass1, 1.0)
+    mass2 = np.where(valid, mass2, 1.0)
+
+    w_start = values['w_start'] + system.keplers_third_law_fast(a, mass1, mass2)
+    despin_time, final_a = system.calculated_tidal_despin_dp_batch(a, w_start, radius, mass1, mass2, values['k_2'], values['Q'], values['alpha'], rtol)
+    return np.where(valid, despin_time, np.nan), np.where(valid, final_a, np.nan)
+
+def run_pipeline(input_path, output_path, chunk_size=100000, columns=None, despin_body='s', rtol=1e-6, report=None):
+    start = time.perf_counter()
+    n_rows = 0
+    with open(input_path, newline='') as input_file, open(output_path, 'w', newline='') as output_file:
+        writer = csv.writer(output_file)
+        reader, header = read_header(input_file)
+        writer.writerow(header + ['despin_time', 'final_a'])
+        for rows, values in _chunks(reader, header, chunk_size, columns):
+            despin_time, final_a = despin_chunk(values, despin_body, rtol)
+            writer.writerows(row + [f'{t:.6E}', f'{a:.6E}'] for row, t, a in zip(rows, despin_time, final_a))
+
+            n_rows += len(rows)
+            elapsed = time.perf_counter() - start
+            if report is not None:
+                report(n_rows, elapsed)
+
+    elapsed = time.perf_counter() - start
+    return {'rows': n_rows, 'seconds': elapsed, 'rows_per_second': n_rows / elapsed if elapsed > 0 else 0.0}
+
+def print_report(n_rows, elapsed):
+    print(f'{n_rows} rows, {n_rows / elapsed:.0f} rows/s')
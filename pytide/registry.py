@@ -0,0 +1,110 @@
+import numpy as np
+
+from pytide.body import Body
+
+COLUMNS = ('radius', 'mass', 'k_2', 'Q', 'alpha', 'orbit_radius')
+
+class BodyRegistry:
+    # struct-of-arrays store: one contiguous column per parameter, rows addressed by index
+    __slots__ = ('size', 'names', 'index', 'parent', '_columns', '_children')
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.names = []
+        self.index = {}
+        self.parent = np.full(capacity, -1, dtype=np.int64)
+        self._columns = {name: np.zeros(capacity) for name in COLUMNS}
+        self._children = None
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __getattr__(self, name):
+        if name in COLUMNS:
+            return self._columns[name][:self.size]
+        raise AttributeError(f"'BodyRegistry' object has no attribute '{name}'")
+
+    def _grow(self, n):
+        capacity = len(self.parent)
+        if self.size + n <= capacity:
+            return
+        capacity = max(2 * capacity, self.size + n)
+        parent = np.full(capacity, -1, dtype=np.int64)
+        parent[:self.size] = self.parent[:self.size]
+        self.parent = parent
+        for name, column in self._columns.items():
+            self._columns[name] = np.zeros(capacity)
+            self._columns[name][:self.size] = column[:self.size]
+
+    def add(self, name, radius, mass, k_2=0.1, Q=100.0, alpha=0.4, parent=None, orbit_radius=np.nan):
+        # orbit_radius is nan for bodies without a parent or with an unknown orbit
+        if name in self.index:
+            raise ValueError(f'{name} is already registered')
+        self._grow(1)
+        i = self.size
+        self.names.append(name)
+        self.index[name] = i
+        self.parent[i] = -1 if parent is None else self.index[parent]
+        for column, value in zip(COLUMNS, (radius, mass, k_2, Q, alpha, orbit_radius)):
+            self._columns[column][i] = value
+        self.size += 1
+        self._children = None
+        return i
+
+    def add_body(self, body, parent=None, orbit_radius=np.nan):
+        return self.add(body.name, body.radius, body.mass, body.k_2, body.Q, body.alpha, parent, orbit_radius)
+
+    def add_tree(self, body, parent=None, orbit_radius=np.nan):
+        # Body.satellites stores unknown orbits as 0
+        self.add_body(body, parent, orbit_radius)
+        for satellite, satellite_orbit in body.satellites.values():
+            self.add_tree(satellite, body.name, satellite_orbit if satellite_orbit > 0 else np.nan)
+
+    @classmethod
+    def from_body(cls, root):
+        registry = cls()
+        registry.add_tree(root)
+        return registry
+
+    def body(self, i):
+        if isinstance(i, str):
+            i = self.index[i]
+        return Body(self.names[i], self.radius[i], self.mass[i], self.k_2[i], self.Q[i], self.alpha[i])
+
+    def children(self, i):
+        if isinstance(i, str):
+            i = self.index[i]
+        if self._children is None:
+            # CSR parent -> children index, rebuilt after the registry changes
+            parent = self.parent[:self.size]
+            order = np.argsort(parent, kind='stable')
+            counts = np.bincount(parent[parent >= 0], minlength=self.size)
+            self._children = (np.concatenate(([0], np.cumsum(counts))), order[np.sum(parent < 0):])
+        indptr, order = self._children
+        return order[indptr[i]:indptr[i + 1]]
+
+    def satellites(self, known_orbits=True):
+        satellites = np.flatnonzero(self.parent[:self.size] >= 0)
+        if known_orbits:
+            satellites = satellites[np.isfinite(self.orbit_radius[satellites])]
+        return satellites
+
+    def pair_columns(self, satellites=None, despin_body='s'):
+        if satellites is None:
+            satellites = self.satellites()
+        elif not isinstance(satellites, np.ndarray):
+            satellites = np.array([self.index[s] if isinstance(s, str) else s for s in satellites], dtype=np.int64)
+        hosts = self.parent[satellites]
+        body1, body2 = (satellites, hosts) if despin_body == 's' else (hosts, satellites)
+        return {'a': self.orbit_radius[satellites], 'radius': self.radius[body1], 'mass1': self.mass[body1], 'mass2': self.mass[body2], 'k_2': self.k_2[body1], 'Q': self.Q[body1], 'alpha': self.alpha[body1]}
+
+    def despin_times(self, satellites=None, w_start=0.000174, despin_body='s', rtol=1e-6):
+        import pytide.system as system
+
+        columns = self.pair_columns(satellites, despin_body)
+        # w_start is the spin in excess of the orbital rate, as in Body.get_despin_time
+        w_start = w_start + system.keplers_third_law_fast(columns['a'], columns['mass1'], columns['mass2'])
+        return system.calculated_tidal_despin_dp_batch(columns['a'], w_start, columns['radius'], columns['mass1'], columns['mass2'], columns['k_2'], columns['Q'], columns['alpha'], rtol)
@@ -0,0 +1,105 @@
+import os
+import concurrent.futures
+
+import numpy as np
+import numba as nb
+
+import pytide.system as system
+
+PARAMETERS = ('a', 'w_start', 'radius', 'mass1', 'mass2', 'k_2', 'Q', 'alpha')
+RESULTS = ('despin_time', 'final_a')
+
+def parameter_grid(**axes):
+    names = list(axes)
+    grids = np.meshgrid(*[np.atleast_1d(np.asarray(axes[name], dtype=np.float64)) for name in names], indexing='ij')
+    return {name: grid.ravel() for name, grid in zip(names, grids)}
+
+def pair_values(host, satellite, despin_body='s'):
+    # w_start is the spin in excess of the orbital rate, as in Body.get_despin_time
+    satellite, a = host.satellites[satellite]
+    if despin_body == 's':
+        body1, body2 = satellite, host
+    else:
+        body1, body2 = host, satellite
+
+    return {'a': a, 'w_start': 0.000174, 'radius': body1.radius, 'mass1': body1.mass, 'mass2': body2.mass, 'k_2': body1.k_2, 'Q': body1.Q, 'alpha': body1.alpha}
+
+def pair_parameters(host, satellite, despin_body='s', **axes):
+    values = pair_values(host, satellite, despin_body)
+    values.update(axes)
+    parameters = parameter_grid(**values)
+    parameters['w_start'] = parameters['w_start'] + system.keplers_third_law_fast(parameters['a'], parameters['mass1'], parameters['mass2'])
+    return parameters
+
+def _init_worker():
+    # the process pool already uses every core, so keep numba to one thread per worker
+    nb.set_num_threads(1)
+
+def _solve_chunk(solver, start, arrays):
+    if solver == 'quad':
+        despin_time, final_a, error = system.calculated_tidal_despin_quad_batch(*arrays)
+    else:
+        despin_time, final_a = system.calculated_tidal_despin_batch(*arrays)
+    return start, despin_time, final_a
+
+def _open(path, name, size, mode):
+    file = os.path.join(path, name + '.npy')
+    if mode == 'w+':
+        return np.lib.format.open_memmap(file, mode='w+', dtype=np.float64 if name != 'done' else np.bool_, shape=(size,))
+    return np.load(file, mmap_mode=mode)
+
+def _store(in_flight, return_when, results, done, chunk_size):
+    finished, in_flight = concurrent.futures.wait(in_flight, return_when=return_when)
+    for future in finished:
+        start, *values = future.result()
+        for result, value in zip(results, values):
+            result[start:start + len(value)] = value
+            result.flush()
+        # a chunk is only marked done once its results are on disk
+        done[start // chunk_size] = True
+        done.flush()
+    return in_flight
+
+def run_sweep(parameters, path, chunk_size=10000, max_workers=None, solver='batch'):
+    arrays = np.broadcast_arrays(*[np.asarray(parameters[name], dtype=np.float64).ravel() for name in PARAMETERS])
+    size = len(arrays[0])
+    n_chunks = (size + chunk_size - 1) // chunk_size
+
+    if os.path.exists(os.path.join(path, 'done.npy')):
+        for name, values in zip(PARAMETERS, arrays):
+            if not np.array_equal(_open(path, name, size, 'r'), values):
+                raise ValueError(f'{path} holds a sweep with different {name} values')
+        # done.npy is indexed by chunk and the results must come from one solver
+        for name, value in (('chunk_size', chunk_size), ('solver', solver)):
+            file = os.path.join(path, name + '.npy')
+            if not os.path.exists(file) or np.load(file).item() != value:
+                raise ValueError(f'{path} holds a sweep with a different {name}')
+        results = [_open(path, name, size, 'r+') for name in RESULTS]
+        done = _open(path, 'done', n_chunks, 'r+')
+    else:
+        os.makedirs(path, exist_ok=True)
+        for name, values in zip(PARAMETERS, arrays):
+            np.save(os.path.join(path, name + '.npy'), values)
+        np.save(os.path.join(path, 'chunk_size.npy'), np.array(chunk_size))
+        np.save(os.path.join(path, 'solver.npy'), np.array(solver))
+        results = [_open(path, name, size, 'w+') for name in RESULTS]
+        done = _open(path, 'done', n_chunks, 'w+')
+
+    max_workers = max_workers or os.cpu_count()
+    with concurrent.futures.ProcessPoolExecutor(max_workers, initializer=_init_worker) as pool:
+        # keep a bounded number of chunks in flight so memory stays flat for large sweeps
+        in_flight = set()
+        for i in range(n_chunks):
+            if done[i]:
+                continue
+            start = i * chunk_size
+            chunk = [values[start:start + chunk_size] for values in arrays]
+            in_flight.add(pool.submit(_solve_chunk, solver, start, chunk))
+            if len(in_flight) >= 2 * max_workers:
+                in_flight = _store(in_flight, concurrent.futures.FIRST_COMPLETED, results, done, chunk_size)
+        _store(in_flight, concurrent.futures.ALL_COMPLETED, results, done, chunk_size)
+
+    return load_sweep(path)
+
+def load_sweep(path):
+    return {name: np.load(os.path.join(path, name + '.npy'), mmap_mode='r') for name in PARAMETERS + RESULTS + ('done',)}
@@ -1,26 +1,31 @@
-import pytide
 import numpy as np
-import scipy.integrate
 import numba as nb
 
+from pytide.cache import cached
+
 G = 6.67408 * 10**-11
 
-@nb.njit()
+# 7-point Gauss / 15-point Kronrod nodes and weights on [0, 1], mirrored about 0
+GK15_NODES = np.array([0.991455371120812639206854697526329, 0.949107912342758524526189684047851, 0.864864423359769072789712788640926, 0.741531185599394439863864773280788, 0.586087235467691130294144845693013, 0.405845151377397166906606412076961, 0.207784955007898467600689403773245, 0.000000000000000000000000000000000])
+GK15_WEIGHTS = np.array([0.022935322010529224963732008058970, 0.063092092629978553290700663189204, 0.104790010322250183839876322541518, 0.140653259715525918745189590510238, 0.169004726639267902826583426598550, 0.190350578064785409913256402421014, 0.204432940075298892414161999234649, 0.209482141084727828012999174891714])
+G7_WEIGHTS = np.array([0.0, 0.129484966168869693270611432679082, 0.0, 0.279705391489276667901467771423780, 0.0, 0.381830050505118944950369775488975, 0.0, 0.417959183673469387755102040816327])
+
+@nb.njit(cache=True)
 def sigmoid(x):
     return (2 / (1 + np.exp(-1000000.0 * x))) - 1
 
-@nb.njit()
+@nb.njit(cache=True)
 def keplers_third_law_fast(a, mass1, mass2):
     return np.sqrt(6.67408 * 10**-11.0 * (mass1 + mass2) / a ** 3)
 
 def keplers_third_law(a, body1, body2):
     return np.sqrt(G * (body1.mass + body2.mass) / a ** 3)
 
-@nb.njit()
+@nb.njit(cache=True)
 def calculated_a_gradient_fast(w, a, Q, k_2, r, mass1, mass2):
     return sigmoid(w - keplers_third_law_fast(a, mass1, mass2)) * (3 * k_2 / Q) * (mass2 / mass1) * (r / a) ** 5 * keplers_third_law_fast(a, mass1, mass2) * a
 
-@nb.njit()
+@nb.njit(cache=True)
 def calculated_w_gradient_fast(w, a, Q, k_2, alpha, r, mass1, mass2):
     return -sigmoid(w - keplers_third_law_fast(a, mass1, mass2)) * (3 * k_2 / (2 * alpha * Q)) * (mass2 ** 2 / (mass1 * (mass1 + mass2))) * (r / a) ** 3 * keplers_third_law_fast(a, mass1, mass2) ** 2
 
@@ -42,7 +47,7 @@ def calculated_tidal_despin_gradient(t, y, body1, body2):
 def calculated_tidal_despin_fast(start_a, body1, start_w=0.000174):
     return start_w * start_a ** 6 * body1.Q / (3 * G * body1.k_2 * body1.mass ** 2 * body1.radius ** 3)
 
-@nb.njit()
+@nb.njit(cache=True)
 def calculated_tidal_despin_e_helper(w, a, Q, k_2, alpha, r, mass1, mass2, step):
     start_w = w
     start_a = a
@@ -68,35 +73,538 @@ def calculated_tidal_despin_e_helper(w, a, Q, k_2, alpha, r, mass1, mass2, step)
 def calculated_tidal_despin_e(start_a, start_w, body1, body2, step_size=1.0):
     return calculated_tidal_despin_e_helper(start_w, start_a, body1.Q, body1.k_2, body1.alpha, body1.radius, body1.mass, body2.mass, step_size)
 
+@nb.njit(cache=True)
+def calculated_tidal_despin_gradient_fast(w, a, Q, k_2, alpha, r, mass1, mass2):
+    dw = calculated_w_gradient_fast(w, a, Q, k_2, alpha, r, mass1, mass2)
+    da = calculated_a_gradient_fast(w, a, Q, k_2, r, mass1, mass2)
+    return dw * 365.25 * 24 * 60 * 60, da * 365.25 * 24 * 60 * 60
+
+@nb.njit(cache=True)
+def calculated_tidal_despin_rk_helper(w, a, Q, k_2, alpha, r, mass1, mass2, step_fraction):
+    # RK4 with the step set to a fixed fraction of the remaining time to lock,
+    # so the number of steps depends on the lock threshold and not on the time scale
+    lock = (w - keplers_third_law_fast(a, mass1, mass2)) / 500.0
+    time = 0.0
+    u = w - keplers_third_law_fast(a, mass1, mass2)
+    while u > lock:
+        if time > 10.0**100.0:
+            break
+        dw1, da1 = calculated_tidal_despin_gradient_fast(w, a, Q, k_2, alpha, r, mass1, mass2)
+        du = dw1 + 1.5 * keplers_third_law_fast(a, mass1, mass2) / a * da1
+        if du >= 0.0:
+            break
+        step = -step_fraction * u / du
+
+        dw2, da2 = calculated_tidal_despin_gradient_fast(w + dw1 * step / 2, a + da1 * step / 2, Q, k_2, alpha, r, mass1, mass2)
+        dw3, da3 = calculated_tidal_despin_gradient_fast(w + dw2 * step / 2, a + da2 * step / 2, Q, k_2, alpha, r, mass1, mass2)
+        dw4, da4 = calculated_tidal_despin_gradient_fast(w + dw3 * step, a + da3 * step, Q, k_2, alpha, r, mass1, mass2)
+        new_w = w + (dw1 + 2 * dw2 + 2 * dw3 + dw4) * step / 6
+        new_a = a + (da1 + 2 * da2 + 2 * da3 + da4) * step / 6
+        new_u = new_w - keplers_third_law_fast(new_a, mass1, mass2)
+
+        if new_u <= lock:
+            # linear interpolation back to the lock threshold inside the last step
+            f = (u - lock) / (u - new_u)
+            return time + f * step, a + f * (new_a - a)
+
+        w = new_w
+        a = new_a
+        u = new_u
+        time += step
+
+    return time, a
+
+@nb.njit(parallel=True, cache=True)
+def calculated_tidal_despin_batch_helper(a, w, r, mass1, mass2, k_2, Q, alpha, step_fraction):
+    despin_time = np.zeros(len(a))
+    final_a = np.zeros(len(a))
+    for i in nb.prange(len(a)):
+        despin_time[i], final_a[i] = calculated_tidal_despin_rk_helper(w[i], a[i], Q[i], k_2[i], alpha[i], r[i], mass1[i], mass2[i], step_fraction)
+    return despin_time, final_a
+
+def calculated_tidal_despin_batch(start_a, start_w, radius, mass1, mass2, k_2=0.1, Q=100.0, alpha=0.4, step_fraction=0.01):
+    # every argument may be a scalar or an array, they are broadcast against each other
+    arrays = np.broadcast_arrays(start_a, start_w, radius, mass1, mass2, k_2, Q, alpha)
+    shape = arrays[0].shape
+    start_a, start_w, radius, mass1, mass2, k_2, Q, alpha = [np.ascontiguousarray(x, dtype=np.float64).ravel() for x in arrays]
+    despin_time, final_a = calculated_tidal_despin_batch_helper(start_a, start_w, radius, mass1, mass2, k_2, Q, alpha, step_fraction)
+    return despin_time.reshape(shape), final_a.reshape(shape)
+
+
+class TrajectoryBuffer:
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.data = np.empty((3, capacity))
+
+    def append(self, t, w, a):
+        n = len(t)
+        if self.size + n > self.data.shape[1]:
+            # grow geometrically so appending stays amortized linear
+            data = np.empty((3, max(2 * self.data.shape[1], self.size + n)))
+            data[:, :self.size] = self.data[:, :self.size]
+            self.data = data
+        self.data[0, self.size:self.size + n] = t
+        self.data[1, self.size:self.size + n] = w
+        self.data[2, self.size:self.size + n] = a
+        self.size += n
+
+    def arrays(self):
+        return self.data[0, :self.size].copy(), self.data[1, :self.size].copy(), self.data[2, :self.size].copy()
+
+# explicit Runge-Kutta methods spend a fixed number of RHS evaluations per attempted step
+EVALUATIONS_PER_STEP = {'RK45': 6, 'RK23': 3, 'DOP853': 12}
+
+def solve_ivp_counters(sol, method='RK45', accepted=None):
+    counters = {'nfev': int(sol.nfev), 'njev': int(sol.njev), 'nlu': int(sol.nlu)}
+    if method in EVALUATIONS_PER_STEP:
+        # plus 2 evaluations spent choosing the first step
+        counters['steps'] = max(sol.nfev - 2, 0) // EVALUATIONS_PER_STEP[method]
+    else:
+        counters['steps'] = accepted or 0
+    if accepted is not None:
+        counters['rejected'] = max(counters['steps'] - accepted, 0)
+    return counters
+
+def calculated_tidal_despin_chunks(start_a, start_w, body1, body2, steps=10, callback=None):
+    import scipy.integrate
 
-def calculated_tidal_despin(start_a, start_w, body1, body2, steps=10):
     w = start_w
     a = start_a
     t_max = 10
     t_min = 0
 
-    time_data = np.array([])
-    w_data = np.array([])
-
-    a_data = np.array([])
-
     while (w - keplers_third_law(a, body1, body2)) > (start_w - keplers_third_law(start_a, body1, body2)) / 500:
         initial_conditions = [w, a]
         sol = scipy.integrate.solve_ivp(calculated_tidal_despin_gradient, [t_min, t_max], initial_conditions, t_eval=np.linspace(t_min, t_max, steps), args=(body1, body2,), method='RK45')
-        time_data = np.append(time_data, sol.t)
-        w_data = np.append(w_data, sol.y[0])
-        a_data = np.append(a_data, sol.y[1])
+        if callback is not None:
+            callback(solve_ivp_counters(sol))
+        yield sol.t, sol.y[0], sol.y[1]
 
-        t_min = time_data[-1]
+        t_min = sol.t[-1]
         t_max = t_min * 1.01
-        w = w_data[-1]
-        a = a_data[-1]
-    
-    return time_data, w_data, a_data
-
-    
-
-
-
-
+        w = sol.y[0][-1]
+        a = sol.y[1][-1]
+
+def calculated_tidal_despin(start_a, start_w, body1, body2, steps=10, callback=None):
+    buffer = TrajectoryBuffer()
+    for t, w, a in calculated_tidal_despin_chunks(start_a, start_w, body1, body2, steps, callback):
+        buffer.append(t, w, a)
+
+    return buffer.arrays()
+
+def calculated_tidal_despin_event(start_a, start_w, body1, body2, rtol=1e-6, method='RK45', callback=None):
+    import scipy.integrate
+
+    lock = (start_w - keplers_third_law(start_a, body1, body2)) / 500
+
+    def lock_event(t, y, body1, body2):
+        return y[0] - keplers_third_law(y[1], body1, body2) - lock
+    lock_event.terminal = True
+    lock_event.direction = -1
+
+    # a single solve with unbounded adaptive steps, stopped by the lock event
+    if method == 'auto':
+        method = calculated_tidal_despin_method(start_a, start_w, body1, body2, rtol)
+        if method == 'dp':
+            return calculated_tidal_despin_dp(start_a, start_w, body1, body2, rtol, callback)
+    # the implicit methods get the compiled analytic Jacobian instead of finite differences
+    options = {'jac': calculated_tidal_despin_jacobian} if method in ('Radau', 'BDF', 'LSODA') else {}
+    atol = [rtol * abs(start_w - keplers_third_law(start_a, body1, body2)), rtol * start_a]
+    sol = scipy.integrate.solve_ivp(calculated_tidal_despin_gradient, [0, 10.0**100], [start_w, start_a], args=(body1, body2,), events=lock_event, rtol=rtol, atol=atol, method=method, **options)
+    if callback is not None:
+        callback(solve_ivp_counters(sol, method, len(sol.t) - 1))
+
+    return sol.t, sol.y[0], sol.y[1]
+
+def calculated_tidal_despin_quad_batch(start_a, start_w, radius, mass1, mass2, k_2=0.1, Q=100.0, alpha=0.4, panels=16):
+    arrays = np.broadcast_arrays(start_a, start_w, radius, mass1, mass2, k_2, Q, alpha)
+    start_a, start_w, radius, mass1, mass2, k_2, Q, alpha = [np.asarray(x, dtype=np.float64) for x in arrays]
+
+    # dw/da has no sigmoid in it, so in x = sqrt(a) the spin is linear: w(x) = start_w - K (x - x0)
+    # and the time to lock is the integral of dt/dx = 2 x^12 / (B sigmoid(w(x) - n(x)))
+    sqrt_mu = np.sqrt(G * (mass1 + mass2))
+    K = mass2 * sqrt_mu / (alpha * (mass1 + mass2) * radius ** 2)
+    B = (3 * k_2 / Q) * (mass2 / mass1) * radius ** 5 * sqrt_mu * 365.25 * 24 * 60 * 60
+    x0 = np.sqrt(start_a)
+    u0 = start_w - sqrt_mu / x0 ** 3
+    lock = u0 / 500
+    spinning = u0 > 0
+
+    def u(x):
+        return start_w - K * (x - x0) - sqrt_mu / x ** 3
+
+    # u is concave in x, so there is a single crossing of the lock threshold beyond x0
+    lo = x0.copy()
+    hi = x0 * 2
+    for _ in range(2000):
+        above = spinning & (u(hi) > lock)
+        if not above.any():
+            break
+        lo = np.where(above, hi, lo)
+        hi = np.where(above, hi * 2, hi)
+    for _ in range(100):
+        mid = (lo + hi) / 2
+        above = u(mid) > lock
+        lo = np.where(above, mid, lo)
+        hi = np.where(above, hi, mid)
+    x_lock = np.where(spinning, (lo + hi) / 2, x0)
+
+    # panels are graded geometrically towards the lock where the sigmoid turns over
+    edges = np.append(0.5 ** np.arange(panels), 0.0)
+    distance = x_lock - x0
+    nodes = np.concatenate((-GK15_NODES[:-1], GK15_NODES[::-1]))
+    weights_k = np.concatenate((GK15_WEIGHTS[:-1], GK15_WEIGHTS[::-1]))
+    weights_g = np.concatenate((G7_WEIGHTS[:-1], G7_WEIGHTS[::-1]))
+
+    despin_time = np.zeros(start_a.shape)
+    error = np.zeros(start_a.shape)
+    for left, right in zip(edges[:-1], edges[1:]):
+        half = distance * (left - right) / 2
+        centre = x_lock - distance * (left + right) / 2
+        x = centre + half * nodes.reshape((-1,) + (1,) * centre.ndim)
+        x = np.where(spinning, x, x0)
+        # tanh(z / 2) is the same curve as sigmoid(), without overflowing np.exp
+        f = np.where(spinning, 2 * x ** 12 / (B * np.tanh(500000.0 * u(x))), 0.0)
+        kronrod = half * np.tensordot(weights_k, f, axes=1)
+        gauss = half * np.tensordot(weights_g, f, axes=1)
+        despin_time += kronrod
+        error += np.abs(kronrod - gauss)
+
+    return despin_time, x_lock ** 2, error
+
+def calculated_tidal_despin_quad(start_a, start_w, body1, body2, panels=16):
+    despin_time, final_a, error = calculated_tidal_despin_quad_batch(start_a, start_w, body1.radius, body1.mass, body2.mass, body1.k_2, body1.Q, body1.alpha, panels)
+    return float(despin_time), float(final_a)
+
+@nb.njit(cache=True)
+def calculated_lock_rate_fast(dw, da, a, mass1, mass2):
+    return dw + 1.5 * keplers_third_law_fast(a, mass1, mass2) / a * da
+
+@nb.njit(cache=True)
+def calculated_tidal_despin_dp_helper(w, a, Q, k_2, alpha, r, mass1, mass2, rtol, atol_w, atol_a):
+    # embedded Dormand-Prince 5(4) with the same error norm and step control as scipy's RK45
+    lock = (w - keplers_third_law_fast(a, mass1, mass2)) / 500.0
+    capacity = 256
+    t_data = np.empty(capacity)
+    w_data = np.empty(capacity)
+    a_data = np.empty(capacity)
+    t_data[0] = 0.0
+    w_data[0] = w
+    a_data[0] = a
+    size = 1
+
+    time = 0.0
+    u = w - keplers_third_law_fast(a, mass1, mass2)
+    dw1, da1 = calculated_tidal_despin_gradient_fast(w, a, Q, k_2, alpha, r, mass1, mass2)
+    du = calculated_lock_rate_fast(dw1, da1, a, mass1, mass2)
+    accepted = 0
+    rejected = 0
+    if u <= lock or du >= 0.0:
+        return t_data[:size], w_data[:size], a_data[:size], accepted, rejected
+    step = -0.001 * u / du
+
+    while time < 10.0**100.0:
+        dw2, da2 = calculated_tidal_despin_gradient_fast(w + step * (dw1 / 5), a + step * (da1 / 5), Q, k_2, alpha, r, mass1, mass2)
+        dw3, da3 = calculated_tidal_despin_gradient_fast(w + step * (3 * dw1 / 40 + 9 * dw2 / 40), a + step * (3 * da1 / 40 + 9 * da2 / 40), Q, k_2, alpha, r, mass1, mass2)
+        dw4, da4 = calculated_tidal_despin_gradient_fast(w + step * (44 * dw1 / 45 - 56 * dw2 / 15 + 32 * dw3 / 9), a + step * (44 * da1 / 45 - 56 * da2 / 15 + 32 * da3 / 9), Q, k_2, alpha, r, mass1, mass2)
+        dw5, da5 = calculated_tidal_despin_gradient_fast(w + step * (19372 * dw1 / 6561 - 25360 * dw2 / 2187 + 64448 * dw3 / 6561 - 212 * dw4 / 729), a + step * (19372 * da1 / 6561 - 25360 * da2 / 2187 + 64448 * da3 / 6561 - 212 * da4 / 729), Q, k_2, alpha, r, mass1, mass2)
+        dw6, da6 = calculated_tidal_despin_gradient_fast(w + step * (9017 * dw1 / 3168 - 355 * dw2 / 33 + 46732 * dw3 / 5247 + 49 * dw4 / 176 - 5103 * dw5 / 18656), a + step * (9017 * da1 / 3168 - 355 * da2 / 33 + 46732 * da3 / 5247 + 49 * da4 / 176 - 5103 * da5 / 18656), Q, k_2, alpha, r, mass1, mass2)
+        new_w = w + step * (35 * dw1 / 384 + 500 * dw3 / 1113 + 125 * dw4 / 192 - 2187 * dw5 / 6784 + 11 * dw6 / 84)
+        new_a = a + step * (35 * da1 / 384 + 500 * da3 / 1113 + 125 * da4 / 192 - 2187 * da5 / 6784 + 11 * da6 / 84)
+        dw7, da7 = calculated_tidal_despin_gradient_fast(new_w, new_a, Q, k_2, alpha, r, mass1, mass2)
+
+        error_w = step * (71 * dw1 / 57600 - 71 * dw3 / 16695 + 71 * dw4 / 1920 - 17253 * dw5 / 339200 + 22 * dw6 / 525 - dw7 / 40)
+        error_a = step * (71 * da1 / 57600 - 71 * da3 / 16695 + 71 * da4 / 1920 - 17253 * da5 / 339200 + 22 * da6 / 525 - da7 / 40)
+        error_w = error_w / (atol_w + rtol * max(abs(w), abs(new_w)))
+        error_a = error_a / (atol_a + rtol * max(abs(a), abs(new_a)))
+        error = np.sqrt((error_w ** 2 + error_a ** 2) / 2)
+
+        if error > 1.0:
+            step *= max(0.2, 0.9 * error ** -0.2)
+            rejected += 1
+            continue
+        accepted += 1
+
+        new_u = new_w - keplers_third_law_fast(new_a, mass1, mass2)
+        if size == capacity:
+            capacity *= 2
+            t_data = np.concatenate((t_data, np.empty(size)))
+            w_data = np.concatenate((w_data, np.empty(size)))
+            a_data = np.concatenate((a_data, np.empty(size)))
+
+        if new_u <= lock:
+            # cubic Hermite interpolation of u over the step, bisected for the lock crossing
+            du_new = calculated_lock_rate_fast(dw7, da7, new_a, mass1, mass2)
+            lo = 0.0
+            hi = 1.0
+            for _ in range(60):
+                f = (lo + hi) / 2
+                h00 = 2 * f ** 3 - 3 * f ** 2 + 1
+                h10 = f ** 3 - 2 * f ** 2 + f
+                h01 = -2 * f ** 3 + 3 * f ** 2
+                h11 = f ** 3 - f ** 2
+                if h00 * u + h10 * step * du + h01 * new_u + h11 * step * du_new > lock:
+                    lo = f
+                else:
+                    hi = f
+            f = (lo + hi) / 2
+            t_data[size] = time + f * step
+            w_data[size] = lock + keplers_third_law_fast(a + f * (new_a - a), mass1, mass2)
+            a_data[size] = a + f * (new_a - a)
+            size += 1
+            break
 
+        time += step
+        w = new_w
+        a = new_a
+        u = new_u
+        t_data[size] = time
+        w_data[size] = w
+        a_data[size] = a
+        size += 1
+        dw1 = dw7
+        da1 = da7
+        du = calculated_lock_rate_fast(dw1, da1, a, mass1, mass2)
+        step *= min(10.0, 0.9 * max(error, 1e-10) ** -0.2)
+
+    return t_data[:size], w_data[:size], a_data[:size], accepted, rejected
+
+def calculated_tidal_despin_dp(start_a, start_w, body1, body2, rtol=1e-6, callback=None):
+    atol_w = rtol * abs(start_w - keplers_third_law(start_a, body1, body2))
+    t, w, a, accepted, rejected = calculated_tidal_despin_dp_helper(start_w, start_a, body1.Q, body1.k_2, body1.alpha, body1.radius, body1.mass, body2.mass, rtol, atol_w, rtol * start_a)
+    if callback is not None:
+        # one evaluation for the first step, then 6 per attempted step (FSAL)
+        callback({'nfev': 1 + 6 * (accepted + rejected), 'njev': 0, 'nlu': 0, 'steps': accepted + rejected, 'rejected': rejected})
+    return t, w, a
+
+@nb.njit(parallel=True, cache=True)
+def calculated_tidal_despin_dp_batch_helper(a, w, r, mass1, mass2, k_2, Q, alpha, rtol):
+    despin_time = np.zeros(len(a))
+    final_a = np.zeros(len(a))
+    for i in nb.prange(len(a)):
+        atol_w = rtol * abs(w[i] - keplers_third_law_fast(a[i], mass1[i], mass2[i]))
+        t_data, w_data, a_data, accepted, rejected = calculated_tidal_despin_dp_helper(w[i], a[i], Q[i], k_2[i], alpha[i], r[i], mass1[i], mass2[i], rtol, atol_w, rtol * a[i])
+        despin_time[i] = t_data[-1]
+        final_a[i] = a_data[-1]
+    return despin_time, final_a
+
+def calculated_tidal_despin_dp_batch(start_a, start_w, radius, mass1, mass2, k_2=0.1, Q=100.0, alpha=0.4, rtol=1e-6):
+    arrays = np.broadcast_arrays(start_a, start_w, radius, mass1, mass2, k_2, Q, alpha)
+    shape = arrays[0].shape
+    start_a, start_w, radius, mass1, mass2, k_2, Q, alpha = [np.ascontiguousarray(x, dtype=np.float64).ravel() for x in arrays]
+    despin_time, final_a = calculated_tidal_despin_dp_batch_helper(start_a, start_w, radius, mass1, mass2, k_2, Q, alpha, rtol)
+    return despin_time.reshape(shape), final_a.reshape(shape)
+
+def calculated_coupled_despin_gradient(t, y, satellite, host, locked):
+    w_s, w_p, a = y
+    da_s = 0.0 if locked[0] else calculated_a_gradient(w_s, a, satellite, host)
+    da_p = 0.0 if locked[1] else calculated_a_gradient(w_p, a, host, satellite)
+    da = da_s + da_p
+    # a locked spin follows the orbital rate and no longer exchanges angular momentum with the orbit
+    dn = -1.5 * keplers_third_law(a, satellite, host) / a * da
+    dw_s = dn if locked[0] else calculated_w_gradient(w_s, a, satellite, host)
+    dw_p = dn if locked[1] else calculated_w_gradient(w_p, a, host, satellite)
+
+    return np.array([dw_s, dw_p, da]) * 365.25 * 24 * 60 * 60
+
+def calculated_tidal_despin_coupled(start_a, start_w_s, start_w_p, satellite, host, rtol=1e-6, method='RK45'):
+    import scipy.integrate
+
+    start_n = keplers_third_law(start_a, satellite, host)
+    locks = [(start_w_s - start_n) / 500, (start_w_p - start_n) / 500]
+    # spins that start at or below the orbital rate count as locked from the start, as in calculated_tidal_despin
+    locked = [locks[0] <= 0, locks[1] <= 0]
+    lock_times = [0.0 if locked[0] else np.nan, 0.0 if locked[1] else np.nan]
+
+    def lock_event(i):
+        def event(t, y, satellite, host, locked):
+            if locked[i]:
+                return 1.0
+            return y[i] - keplers_third_law(y[2], satellite, host) - locks[i]
+        event.terminal = True
+        event.direction = -1
+        return event
+    events = [lock_event(0), lock_event(1)]
+
+    atol = [rtol * max(abs(locks[0]), abs(locks[1])) * 500, rtol * max(abs(locks[0]), abs(locks[1])) * 500, rtol * start_a]
+    buffer = TrajectoryBuffer()
+    w_p_data = [np.array([])]
+    t = 0.0
+    y = [start_w_s, start_w_p, start_a]
+    # one solve for both spins and the shared orbit, restarted only once when the first spin locks
+    while not all(locked):
+        sol = scipy.integrate.solve_ivp(calculated_coupled_despin_gradient, [t, 10.0**100], y, args=(satellite, host, tuple(locked)), events=events, rtol=rtol, atol=atol, method=method)
+        buffer.append(sol.t, sol.y[0], sol.y[2])
+        w_p_data.append(sol.y[1])
+        t = sol.t[-1]
+        y = sol.y[:, -1]
+        if sol.status != 1:
+            break
+        for i in range(2):
+            if len(sol.t_events[i]):
+                locked[i] = True
+                lock_times[i] = sol.t_events[i][0]
+
+    t_data, w_s_data, a_data = buffer.arrays()
+    return lock_times, t_data, w_s_data, np.concatenate(w_p_data), a_data
+
+@nb.njit(cache=True)
+def calculated_system_gradient_fast(y, host_params, sat_params):
+    # y = [w_host, w_1..w_n, a_1..a_n]; params rows are (Q, k_2, alpha, radius, mass)
+    n = sat_params.shape[1]
+    w_host = y[0]
+    w = y[1:n + 1]
+    a = y[n + 1:]
+    Q, k_2, alpha, r, mass = sat_params[0], sat_params[1], sat_params[2], sat_params[3], sat_params[4]
+    host_Q, host_k_2, host_alpha, host_r, host_mass = host_params[0], host_params[1], host_params[2], host_params[3], host_params[4]
+
+    dw_host = calculated_w_gradient_fast(w_host, a, host_Q, host_k_2, host_alpha, host_r, host_mass, mass)
+    dw = calculated_w_gradient_fast(w, a, Q, k_2, alpha, r, mass, host_mass)
+    da = calculated_a_gradient_fast(w, a, Q, k_2, r, mass, host_mass) + calculated_a_gradient_fast(w_host, a, host_Q, host_k_2, host_r, host_mass, mass)
+
+    dy = np.empty(2 * n + 1)
+    # the host feels the sum of the torques from every satellite
+    dy[0] = np.sum(dw_host)
+    dy[1:n + 1] = dw
+    dy[n + 1:] = da
+    return dy * 365.25 * 24 * 60 * 60
+
+def calculated_system_evolution(host, satellites=None, w_host=None, w_satellites=None, t_max=None, rtol=1e-6, method='LSODA'):
+    import scipy.integrate
+
+    # satellites with unknown orbits are stored with radius 0 and are skipped
+    if satellites is None:
+        satellites = [name for name, (body, a) in host.satellites.items() if a > 0]
+    bodies = [host.satellites[name][0] for name in satellites]
+    start_a = np.array([host.satellites[name][1] for name in satellites], dtype=np.float64)
+    sat_params = np.array([[b.Q, b.k_2, b.alpha, b.radius, b.mass] for b in bodies], dtype=np.float64).T.copy()
+    host_params = np.array([host.Q, host.k_2, host.alpha, host.radius, host.mass], dtype=np.float64)
+
+    start_n = keplers_third_law_fast(start_a, sat_params[4], host.mass)
+    if w_satellites is None:
+        w_satellites = 0.000174 + start_n
+    if w_host is None:
+        w_host = 0.000174 + np.max(start_n)
+    w_satellites = np.broadcast_to(np.asarray(w_satellites, dtype=np.float64), start_a.shape)
+    locks = (w_satellites - start_n) / 500
+
+    def gradient(t, y):
+        return calculated_system_gradient_fast(y, host_params, sat_params)
+
+    n = len(start_a)
+    spinning = locks > 0
+
+    def margins(y):
+        # distance of every satellite above its lock threshold, one column per state in y
+        return y[1:n + 1] - keplers_third_law_fast(y[n + 1:], sat_params[4][:, None], host.mass) - locks[:, None]
+
+    # satellites already at or below the orbital rate are locked from the start and left out
+    spinning_w = 1 + np.flatnonzero(spinning)
+    spinning_mass = sat_params[4][spinning]
+    spinning_locks = locks[spinning]
+    def all_locked(t, y):
+        return np.max((y[spinning_w] - keplers_third_law_fast(y[n + spinning_w], spinning_mass, host.mass)) / spinning_locks) - 1
+    all_locked.terminal = True
+    all_locked.direction = -1
+
+    y0 = np.concatenate(([w_host], w_satellites, start_a))
+    atol = np.concatenate(([rtol * abs(w_host - np.max(start_n))], rtol * np.abs(locks) * 500, rtol * start_a))
+    if t_max is not None:
+        t_end, events = t_max, None
+    elif spinning.any():
+        t_end, events = 10.0**100, all_locked
+    else:
+        t_end, events = 0.0, None
+    # without the analytic Jacobian LSODA spends 2n + 1 gradient calls on every finite-difference Jacobian
+    options = {'jac': lambda t, y: calculated_system_jacobian_fast(y, host_params, sat_params)} if method in ('Radau', 'BDF', 'LSODA') else {}
+    sol = scipy.integrate.solve_ivp(gradient, [0, t_end], y0, events=events, rtol=rtol, atol=atol, method=method, dense_output=True, **options)
+
+    # each lock time is bracketed by the first accepted step that crosses its threshold, then bisected on the
+    # dense output for all satellites at once
+    margin = margins(sol.y)
+    if sol.status == 1:
+        # the terminal event stops exactly on the last satellite's threshold
+        margin[spinning, -1] = np.minimum(margin[spinning, -1], 0.0)
+    crossed = spinning & (margin <= 0).any(axis=1)
+    lock_times = np.where(spinning, np.nan, 0.0)
+    if crossed.any():
+        index = np.argmax(margin[crossed] <= 0, axis=1)
+        low = sol.t[index - 1]
+        high = sol.t[index]
+        rows = np.flatnonzero(crossed)
+        for _ in range(60):
+            middle = 0.5 * (low + high)
+            above = margins(sol.sol(middle))[rows, np.arange(len(rows))] > 0
+            low = np.where(above, middle, low)
+            high = np.where(above, high, middle)
+        lock_times[crossed] = high
+
+    return satellites, lock_times, sol
+
+@nb.njit(cache=True)
+def calculated_tidal_despin_jacobian_fast(w, a, Q, k_2, alpha, r, mass1, mass2):
+    # analytic Jacobian of (dw, da) with respect to (w, a), using sigmoid'(u) = 500000 (1 - sigmoid(u)^2)
+    n = keplers_third_law_fast(a, mass1, mass2)
+    s = sigmoid(w - n)
+    ds = 500000.0 * (1 - s * s)
+    du_da = 1.5 * n / a
+    dw = (3 * k_2 / (2 * alpha * Q)) * (mass2 ** 2 / (mass1 * (mass1 + mass2))) * (r / a) ** 3 * n ** 2
+    da = (3 * k_2 / Q) * (mass2 / mass1) * (r / a) ** 5 * n * a
+
+    jacobian = np.empty((2, 2))
+    jacobian[0, 0] = -ds * dw
+    jacobian[0, 1] = -ds * du_da * dw + 6 * s * dw / a
+    jacobian[1, 0] = ds * da
+    jacobian[1, 1] = ds * du_da * da - 5.5 * s * da / a
+    return jacobian * 365.25 * 24 * 60 * 60
+
+def calculated_tidal_despin_jacobian(t, y, body1, body2):
+    w, a = y
+    return calculated_tidal_despin_jacobian_fast(w, a, body1.Q, body1.k_2, body1.alpha, body1.radius, body1.mass, body2.mass)
+
+@nb.njit(cache=True)
+def calculated_system_jacobian_fast(y, host_params, sat_params):
+    # Jacobian of calculated_system_gradient_fast from the pair Jacobians of every satellite and of the host against it
+    n = sat_params.shape[1]
+    jacobian = np.zeros((2 * n + 1, 2 * n + 1))
+    for i in range(n):
+        w, a = y[1 + i], y[n + 1 + i]
+        satellite = calculated_tidal_despin_jacobian_fast(w, a, sat_params[0, i], sat_params[1, i], sat_params[2, i], sat_params[3, i], sat_params[4, i], host_params[4])
+        host = calculated_tidal_despin_jacobian_fast(y[0], a, host_params[0], host_params[1], host_params[2], host_params[3], host_params[4], sat_params[4, i])
+        jacobian[0, 0] += host[0, 0]
+        jacobian[0, n + 1 + i] = host[0, 1]
+        jacobian[1 + i, 1 + i] = satellite[0, 0]
+        jacobian[1 + i, n + 1 + i] = satellite[0, 1]
+        jacobian[n + 1 + i, 0] = host[1, 0]
+        jacobian[n + 1 + i, 1 + i] = satellite[1, 0]
+        jacobian[n + 1 + i, n + 1 + i] = satellite[1, 1] + host[1, 1]
+    return jacobian
+
+# how far along the negative real axis the Dormand-Prince pair behind RK45 and calculated_tidal_despin_dp stays stable
+DP_STABILITY_LIMIT = 3.3
+
+def calculated_stiffness_estimate(w, a, body1, body2, rtol=1e-6):
+    # largest Jacobian eigenvalue times the step RK45's error control would take at (w, a): the time scale
+    # |u| / |du/dt| of the spin excess scaled by rtol^(1/5) for a fifth order method
+    dw, da = calculated_tidal_despin_gradient(0, [w, a], body1, body2)
+    u = w - keplers_third_law(a, body1, body2)
+    step = abs(u / calculated_lock_rate_fast(dw, da, a, body1.mass, body2.mass)) * rtol ** 0.2
+    return np.max(np.abs(np.linalg.eigvals(calculated_tidal_despin_jacobian(0, [w, a], body1, body2)))) * step
+
+def calculated_tidal_despin_method(start_a, start_w, body1, body2, rtol=1e-6):
+    # checked at the start and at the lock threshold, where the sigmoid turns the spin equation stiffest. an explicit
+    # step inside the stability limit is set by accuracy, so the compiled Dormand-Prince solve is used directly;
+    # past it LSODA switches to BDF with the analytic Jacobian
+    start_n = keplers_third_law(start_a, body1, body2)
+    lock_w = start_n + (start_w - start_n) / 500
+    stiffness = max(calculated_stiffness_estimate(start_w, start_a, body1, body2, rtol), calculated_stiffness_estimate(lock_w, start_a, body1, body2, rtol))
+    if stiffness > DP_STABILITY_LIMIT:
+        return 'LSODA'
+    return 'dp'
+
+# memoized solvers for repeat queries, keyed on the inputs and the source of this module (see pytide.cache)
+calculated_tidal_despin_cached = cached(calculated_tidal_despin)
+calculated_tidal_despin_event_cached = cached(calculated_tidal_despin_event)
+calculated_tidal_despin_dp_cached = cached(calculated_tidal_despin_dp)
+calculated_tidal_despin_quad_cached = cached(calculated_tidal_despin_quad)
+calculated_tidal_despin_coupled_cached = cached(calculated_tidal_despin_coupled)
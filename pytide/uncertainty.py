@@ -0,0 +1,53 @@
+import numpy as np
+
+import pytide.system as system
+import pytide.sweep as sweep
+
+def sample_parameter(distribution, size, rng):
+    # a distribution is a constant, a callable (rng, size) -> samples,
+    # or a tuple ('uniform' | 'loguniform', low, high) / ('normal' | 'lognormal', mean, sigma)
+    if callable(distribution):
+        return np.asarray(distribution(rng, size), dtype=np.float64)
+    if not isinstance(distribution, tuple):
+        return np.full(size, distribution, dtype=np.float64)
+
+    kind, p1, p2 = distribution
+    if kind == 'uniform':
+        return rng.uniform(p1, p2, size)
+    if kind == 'loguniform':
+        return np.exp(rng.uniform(np.log(p1), np.log(p2), size))
+    if kind == 'normal':
+        return rng.normal(p1, p2, size)
+    if kind == 'lognormal':
+        return rng.lognormal(p1, p2, size)
+    raise ValueError(f'unknown distribution {kind}')
+
+class DespinDistribution:
+    def __init__(self, despin_time, final_a, parameters):
+        self.despin_time = despin_time
+        self.final_a = final_a
+        self.parameters = parameters
+
+    def percentiles(self, q=(5, 16, 50, 84, 95)):
+        return np.percentile(self.despin_time, q)
+
+    def histogram(self, bins=50, log=True):
+        # lock times span many decades, so bin in log10 by default
+        if log:
+            return np.histogram(np.log10(self.despin_time[self.despin_time > 0]), bins)
+        return np.histogram(self.despin_time, bins)
+
+    def __str__(self):
+        p5, p16, p50, p84, p95 = self.percentiles()
+        return f'median={p50:.2E}, 68%=[{p16:.2E}, {p84:.2E}], 90%=[{p5:.2E}, {p95:.2E}], n={len(self.despin_time)}'
+
+def sample_despin_times(host, satellite, n_samples=100000, despin_body='s', seed=None, rtol=1e-6, **distributions):
+    rng = np.random.default_rng(seed)
+    values = sweep.pair_values(host, satellite, despin_body)
+    values.update(distributions)
+    parameters = {name: sample_parameter(values[name], n_samples, rng) for name in sweep.PARAMETERS}
+
+    w_start = parameters['w_start'] + system.keplers_third_law_fast(parameters['a'], parameters['mass1'], parameters['mass2'])
+    despin_time, final_a = system.calculated_tidal_despin_dp_batch(parameters['a'], w_start, parameters['radius'], parameters['mass1'], parameters['mass2'], parameters['k_2'], parameters['Q'], parameters['alpha'], rtol)
+
+    return DespinDistribution(despin_time, final_a, parameters)
@@ -0,0 +1,13 @@
+import pytide
+
+for host_name, satellite_name, despin_body in pytide.catalog.PAIRS:
+    host = getattr(pytide.body, host_name)
+    satellite, a = host.satellites[satellite_name]
+    w_start = 0.000174 + pytide.system.keplers_third_law(a, host, satellite)
+    body1, body2 = (satellite, host) if despin_body == 's' else (host, satellite)
+
+    ode_time = pytide.system.calculated_tidal_despin_event(a, w_start, body1, body2, 1e-10)[0][-1]
+    quad_time, quad_a = pytide.system.calculated_tidal_despin_quad(a, w_start, body1, body2)
+    fast_time = pytide.system.calculated_tidal_despin_fast(a, body1)
+
+    print(f'{body1.name}, {body2.name}\node {ode_time:.6E}, quad {quad_time:.6E} ({quad_time / ode_time - 1:+.1E}), fast {fast_time:.2E}')
@@ -2,6 +2,7 @@ import numpy as np
 import math
 import numba
 import tide_sim_eng as eng
+import tide_sim_mesh as mesh
 
 def dot(vector1, vector2):
     return vector1[0] * vector2[0] + vector1[1] * vector2[1]
@@ -9,6 +10,15 @@ def dot(vector1, vector2):
 def norm(vec):
     return math.sqrt(vec[0] ** 2 + vec[1] ** 2)
 
+# ring buffer columns written by tide_sim_eng.move_sampled
+SAMPLE_SUBSTEP, SAMPLE_SPEED, SAMPLE_TORQUE, SAMPLE_KINETIC, SAMPLE_POTENTIAL = 0, 1, 2, 3, 4
+
+def kernel(name, dtype):
+    # an AOT build exports the float32 kernels under _f4 names, the JIT dispatchers take either dtype
+    if np.dtype(dtype) == np.float32 and hasattr(eng, name + '_f4'):
+        return getattr(eng, name + '_f4')
+    return getattr(eng, name)
+
 class Body:
     def __init__(self):
         self.nodes_pos = []
@@ -25,24 +35,71 @@ class Body:
         self.x = []
         self.last_x = 0
         self.angle_data = [0]
+        self.energy_data = []
+        self.dtype = 'f8'
 
-    def show_sim(self):
-        self.nodes_pos = np.array(self.nodes_pos, 'f8')
-        self.nodes_velocity = np.array(self.nodes_velocity, 'f8')
+    def setup_sim(self):
+        self.nodes_pos = np.array(self.nodes_pos, self.dtype)
+        self.nodes_velocity = np.array(self.nodes_velocity, self.dtype)
 
         self.springs_nodes = np.array(self.springs_nodes, 'i4')
-        self.springs_s = np.array(self.springs_s, 'f8')
+        self.springs_s = np.array(self.springs_s, self.dtype)
 
-        fps = 2**10
-        clock = pygame.time.Clock()
-        self.start_springs_length, vector = eng.get_springs_length(self.nodes_pos, self.springs_nodes)
+        self.start_springs_length, vector = kernel('get_springs_length', self.dtype)(self.nodes_pos, self.springs_nodes)
         self.nodes_pos = self.nodes_pos.copy()
-        self.nodes_velocity = np.zeros((len(self.nodes_pos), 2), 'f8')
-        for i in range(1, len(self.nodes_velocity)):
-            print(i)
-            self.nodes_velocity[i] = np.array([self.nodes_pos[i][1], -self.nodes_pos[i][0]]) / 10
-            print(self.nodes_velocity[i])
+        self.nodes_velocity = np.zeros((len(self.nodes_pos), 2), self.dtype)
+        self.nodes_velocity[1:, 0] = self.nodes_pos[1:, 1] / 10
+        self.nodes_velocity[1:, 1] = -self.nodes_pos[1:, 0] / 10
         self.last_springs_length = self.start_springs_length.copy()
+        self.workspace = np.zeros((len(self.nodes_pos), 2), self.dtype)
+        self.samples = np.zeros((64, 5), 'f8')
+        self.sample_index = 0
+        self.stable_dt = kernel('get_stable_timestep', self.dtype)(self.springs_nodes, self.springs_s, len(self.nodes_pos), 0.01, 0.5)
+
+    def step(self, fps):
+        kernel('move_inplace', self.dtype)(self.nodes_pos, self.nodes_velocity, self.start_springs_length, self.springs_nodes, self.springs_s, self.last_springs_length, 0.01, 0.5, fps, self.workspace)
+
+    def step_verlet(self, fps, dt=None, max_strain=0.0):
+        # covers the same fps / 60 time units as step(fps), by default in steps of half the stability limit
+        if dt is None:
+            dt = self.stable_dt / 2
+        return kernel('move_verlet', self.dtype)(self.nodes_pos, self.nodes_velocity, self.start_springs_length, self.springs_nodes, self.springs_s, self.last_springs_length, 0.01, 0.5, fps / 60, dt, max_strain, self.workspace)
+
+    def step_sampled(self, fps, sample_every):
+        # the engine recentres and writes a diagnostics row every sample_every substeps
+        rows = -(-fps // sample_every)
+        if rows > len(self.samples):
+            self.samples = np.zeros((rows, 5), 'f8')
+            self.sample_index = 0
+        first = self.sample_index
+        self.sample_index = kernel('move_sampled', self.dtype)(self.nodes_pos, self.nodes_velocity, self.start_springs_length, self.springs_nodes, self.springs_s, self.last_springs_length, 0.01, 0.5, fps, self.workspace, sample_every, self.samples, self.sample_index, self.last_x)
+        new = self.samples[np.arange(first, self.sample_index) % len(self.samples)]
+        if first == 0:
+            # the first row has no previous speed, angle_data already starts with a 0
+            new = new[1:]
+            self.data.append(float(self.samples[0, SAMPLE_SPEED]))
+            self.x.append(float(self.samples[0, SAMPLE_SUBSTEP]))
+            self.energy_data.append(float(self.samples[0, SAMPLE_KINETIC] + self.samples[0, SAMPLE_POTENTIAL]))
+        self.data.extend(new[:, SAMPLE_SPEED].tolist())
+        self.x.extend(new[:, SAMPLE_SUBSTEP].tolist())
+        self.angle_data.extend(new[:, SAMPLE_TORQUE].tolist())
+        self.energy_data.extend((new[:, SAMPLE_KINETIC] + new[:, SAMPLE_POTENTIAL]).tolist())
+        self.last_x += fps
+
+    def record_frame(self, fps):
+        # self.data.append(self.nodes_pos[1] - eng.get_center(self.nodes_pos))
+        kernel('recenter', self.dtype)(self.nodes_pos, self.nodes_velocity)
+        self.data.append(kernel('get_rotational_speed', self.dtype)(self.nodes_pos, self.nodes_velocity))
+        self.energy_data.append(sum(kernel('get_energy', self.dtype)(self.nodes_velocity, self.start_springs_length, self.springs_s, self.last_springs_length)))
+        self.x.append(self.last_x + fps)
+        self.last_x += fps
+        if len(self.data) > 1:
+            self.angle_data.append((self.data[-2] - self.data[-1]) / fps)
+
+    def show_sim(self):
+        fps = 2**10
+        clock = pygame.time.Clock()
+        self.setup_sim()
         while True:
             clock.tick(60)
             for event in pygame.event.get():
@@ -57,21 +114,9 @@ class Body:
                         print('kr')
                     if event.key == pygame.K_0:
                         return True
-            self.nodes_pos, self.nodes_velocity, self.last_springs_length = eng.move(self.nodes_pos, self.nodes_velocity, self.start_springs_length, self.springs_nodes, self.springs_s, self.last_springs_length, 0.01, 0.5, fps)
+            self.step(fps)
             self.draw_animal()
-            # self.data.append(self.nodes_pos[1] - eng.get_center(self.nodes_pos))
-            avg_node_v = np.sum(self.nodes_velocity, axis=0) / len(self.nodes_velocity)
-            self.nodes_velocity = self.nodes_velocity - avg_node_v
-            q = 0.0
-            cen = eng.get_center(self.nodes_pos)
-            self.nodes_pos -= cen
-            for index, node_v in enumerate(self.nodes_velocity):
-                q += -(np.dot(np.array([node_v[1], -node_v[0]]), (self.nodes_pos[index])) / np.sqrt(np.sum((self.nodes_pos[index]) ** 2)))
-            self.data.append(q / len(self.nodes_velocity))
-            self.x.append(self.last_x + fps)
-            self.last_x += fps
-            if len(self.data) > 1:
-                self.angle_data.append((self.data[-2] - self.data[-1]) / fps)
+            self.record_frame(fps)
             print(fps, self.data[-1], self.angle_data[-1])
             if self.data[-1] < 1:
                 print(self.x[-1])
@@ -79,7 +124,7 @@ class Body:
         return True
 
     def draw_animal(self):
-        self.center = eng.get_center(self.nodes_pos)
+        self.center = kernel('get_center', self.dtype)(self.nodes_pos)
         WIN.fill((255, 255, 255))
         self.draw_muscles()
         self.draw_nodes()
@@ -121,36 +166,12 @@ def draw_rectangle(pos1, pos2, width, colour, cen, size):
     rect.center = old_cen
     WIN.blit(new_image, rect)
 
+def build_disk(body):
+    body.nodes_pos, body.springs_nodes, body.springs_s = mesh.ring_disk([20, 60], [150, 300], 0.1)
+    return body
+
 def main():
-    earth = Body()
-    earth.nodes_pos = [[0.0, 0.0]]
-    n_helper = 3
-    n1 = 20
-    n2 = n1 * n_helper
-    r1 = 150
-    r2 = 300
-    for i in range(n1):
-        x = r1 * np.cos(2 * i * np.pi / n1)
-        y = r1 * np.sin(2 * i * np.pi / n1)
-        earth.nodes_pos.append([x, y])
-        earth.springs_nodes.append([0, i + 1])
-        for ii in range(1):
-            earth.springs_nodes.append([(i - ii - 1)%n1 + 1, i + 1])
-            earth.springs_nodes.append([(i + ii + 1)%n1 + 1, i + 1])
-    for i in range(n2):
-        x = r2 * np.cos(2 * i * np.pi / n2)
-        y = r2 * np.sin(2 * i * np.pi / n2)
-        earth.nodes_pos.append([x, y])
-        earth.springs_nodes.append([((i + n_helper//2)//n_helper)%n1 + 1, i + 1 + n1])
-        for ii in range(1):
-            earth.springs_nodes.append([((i + n_helper//2)//n_helper + ii + 1)%n1 + 1, i + 1 + n1])
-            earth.springs_nodes.append([((i + n_helper//2)//n_helper - ii - 1)%n1 + 1, i + 1 + n1])
-
-        for ii in range(1):
-            earth.springs_nodes.append([(i - ii - 1)%n2 + 1 + n1, i + 1 + n1])
-            earth.springs_nodes.append([(i + ii + 1)%n2 + 1 + n1, i + 1 + n1])
-        
-    earth.springs_s = [0.1 for _ in earth.springs_nodes]
+    earth = build_disk(Body())
     print(earth.nodes_pos)
     earth.show_sim()
     plt.plot(earth.x, earth.data)
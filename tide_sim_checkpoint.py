@@ -0,0 +1,72 @@
+import os
+import json
+
+import numpy as np
+
+import tide_sim
+
+# a checkpoint is a directory: mesh.npz is written once, state.npz is replaced atomically on every
+# checkpoint, and each diagnostic series is a raw f8 file that only ever grows. state.npz records how
+# long every series was when it was written, so anything appended after the last good snapshot is cut off on load
+
+SERIES = ('x', 'data', 'angle_data', 'energy_data')
+
+def write_atomic(path, **arrays):
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+
+def checkpoint(body, path, settings=None):
+    # the first checkpoint of a body into a directory starts it over, later ones only append
+    path = os.path.abspath(path)
+    fresh = getattr(body, 'checkpoint_path', None) != path or not os.path.exists(os.path.join(path, 'state.npz'))
+    os.makedirs(path, exist_ok=True)
+    if fresh:
+        if os.path.exists(os.path.join(path, 'state.npz')):
+            os.remove(os.path.join(path, 'state.npz'))
+        write_atomic(os.path.join(path, 'mesh.npz'), springs_nodes=body.springs_nodes, springs_s=body.springs_s, start_springs_length=body.start_springs_length)
+
+    written = {} if fresh else body.checkpointed
+    lengths = {}
+    for name in SERIES:
+        series = getattr(body, name)
+        with open(os.path.join(path, name + '.f8'), 'wb' if fresh else 'ab') as f:
+            np.asarray(series[written.get(name, 0):], 'f8').tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        lengths[name] = len(series)
+
+    write_atomic(os.path.join(path, 'state.npz'), nodes_pos=body.nodes_pos, nodes_velocity=body.nodes_velocity, last_springs_length=body.last_springs_length,
+                 samples=body.samples, sample_index=body.sample_index, last_x=body.last_x, lengths=json.dumps(lengths), settings=json.dumps(settings or {}))
+    body.checkpointed = lengths
+    body.checkpoint_path = path
+
+def load(path):
+    # returns a Body ready to keep stepping (setup_sim must not be called again) and the saved run settings
+    body = tide_sim.Body()
+    with np.load(os.path.join(path, 'mesh.npz')) as mesh:
+        body.springs_nodes = mesh['springs_nodes']
+        body.springs_s = mesh['springs_s']
+        body.start_springs_length = mesh['start_springs_length']
+    with np.load(os.path.join(path, 'state.npz')) as state:
+        body.nodes_pos = state['nodes_pos']
+        body.dtype = body.nodes_pos.dtype.str
+        body.nodes_velocity = state['nodes_velocity']
+        body.last_springs_length = state['last_springs_length']
+        body.samples = state['samples']
+        body.sample_index = int(state['sample_index'])
+        body.last_x = state['last_x'].item()
+        lengths = json.loads(str(state['lengths']))
+        settings = json.loads(str(state['settings']))
+
+    for name in SERIES:
+        series_path = os.path.join(path, name + '.f8')
+        with open(series_path, 'r+b') as f:
+            f.truncate(lengths[name] * 8)
+        setattr(body, name, np.fromfile(series_path, 'f8').tolist())
+    body.checkpointed = lengths
+    body.checkpoint_path = os.path.abspath(path)
+
+    body.workspace = np.zeros((len(body.nodes_pos), 2), body.dtype)
+    body.stable_dt = tide_sim.kernel('get_stable_timestep', body.dtype)(body.springs_nodes, body.springs_s, len(body.nodes_pos), 0.01, 0.5)
+    return body, settings
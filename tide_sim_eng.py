@@ -4,28 +4,38 @@ import numba
 
 cc = CC('tide_sim_eng')
 
+# every kernel is also exported for float32 arrays under a _f4 name (the JIT dispatchers take either dtype),
+# scalars stay f8; allocations follow the input dtype and constants are cast to it, so both variants type-check
+# without extra copies
+
 @numba.njit
 @cc.export('move_node', 'Tuple((f8[:, :], f8[:, :]))(f8[:, :], f8[:, :], f8[:, :])')
+@cc.export('move_node_f4', 'Tuple((f4[:, :], f4[:, :]))(f4[:, :], f4[:, :], f4[:, :])')
 def move_node(nodes_pos, nodes_forces, nodes_velocity):
-    nodes_velocity = (nodes_velocity + nodes_forces / 60)
-    nodes_pos += nodes_velocity / 60
+    real = nodes_pos.dtype.type
+    nodes_velocity = (nodes_velocity + nodes_forces / real(60))
+    nodes_pos += nodes_velocity / real(60)
     return nodes_pos, nodes_velocity
 
 @numba.njit
 @cc.export('get_springs_length', 'Tuple((f8[:], f8[:, :]))(f8[:, :], i4[:, :])')
+@cc.export('get_springs_length_f4', 'Tuple((f4[:], f4[:, :]))(f4[:, :], i4[:, :])')
 def get_springs_length(nodes_pos, muscles_nodes):
-    vectors = np.zeros((len(muscles_nodes), 2))
+    real = nodes_pos.dtype.type
+    vectors = np.zeros((len(muscles_nodes), 2), nodes_pos.dtype)
     for i in range(len(muscles_nodes)):
         vectors[i] = nodes_pos[muscles_nodes[i][0]] - nodes_pos[muscles_nodes[i][1]]
-    return np.sqrt(np.sum(vectors ** 2, axis = 1)) + 0.01, vectors
+    return np.sqrt(np.sum(vectors * vectors, axis = 1)) + real(0.01), vectors
 
 @numba.njit
 @cc.export('get_springs_forces', 'Tuple((f8[:, :], f8[:]))(f8[:, :], f8[:], i4[:, :], f8[:], f8[:], f8)')
+@cc.export('get_springs_forces_f4', 'Tuple((f4[:, :], f4[:]))(f4[:, :], f4[:], i4[:, :], f4[:], f4[:], f8)')
 def get_springs_forces(nodes_pos, start_muscles_length, muscles_nodes, muscles_strength, last_muscles_length, damping):
+    real = nodes_pos.dtype.type
     muscles_length, unit_vectors = get_springs_length(nodes_pos, muscles_nodes)
     unit_vectors = unit_vectors = unit_vectors / muscles_length.reshape(len(muscles_strength), 1)
-    muscles_forces = unit_vectors * ((((start_muscles_length - muscles_length) * muscles_strength * 4) + (last_muscles_length - muscles_length) * damping).reshape(len(muscles_strength), 1))
-    nodes_forces = np.zeros((len(nodes_pos), 2))
+    muscles_forces = unit_vectors * ((((start_muscles_length - muscles_length) * muscles_strength * real(4)) + (last_muscles_length - muscles_length) * real(damping)).reshape(len(muscles_strength), 1))
+    nodes_forces = np.zeros((len(nodes_pos), 2), nodes_pos.dtype)
     for i in range(len(muscles_strength)):
         nodes_forces[muscles_nodes[i][0]] += muscles_forces[i]
         nodes_forces[muscles_nodes[i][1]] -= muscles_forces[i]
@@ -33,6 +43,7 @@ def get_springs_forces(nodes_pos, start_muscles_length, muscles_nodes, muscles_s
 
 @numba.njit
 @cc.export('move', 'Tuple((f8[:, :], f8[:, :], f8[:]))(f8[:, :], f8[:, :], f8[:], i4[:, :], f8[:], f8[:], f8, f8, i4)')
+@cc.export('move_f4', 'Tuple((f4[:, :], f4[:, :], f4[:]))(f4[:, :], f4[:, :], f4[:], i4[:, :], f4[:], f4[:], f8, f8, i4)')
 def move(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, last_muscles_length, G, damping, fps):
     for _ in range(fps):
         nodes_forces, muscles_length = get_springs_forces(nodes_pos, start_muscles_length, muscles_nodes, muscles_strength, last_muscles_length, damping)
@@ -45,8 +56,226 @@ def move(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles
 
 @numba.njit
 @cc.export('get_center', 'f8[:](f8[:, :])')
+@cc.export('get_center_f4', 'f4[:](f4[:, :])')
 def get_center(nodes_pos):
-    return np.sum(nodes_pos, axis = 0) / len(nodes_pos)
+    return np.sum(nodes_pos, axis = 0) / nodes_pos.dtype.type(len(nodes_pos))
+
+@numba.njit
+@cc.export('make_workspace', 'f8[:, :](i4)')
+def make_workspace(n_nodes):
+    return np.zeros((n_nodes, 2))
+
+@numba.njit
+@cc.export('get_springs_forces_inplace', 'void(f8[:, :], f8[:], i4[:, :], f8[:], f8[:], f8, f8[:, :])')
+@cc.export('get_springs_forces_inplace_f4', 'void(f4[:, :], f4[:], i4[:, :], f4[:], f4[:], f8, f4[:, :])')
+def get_springs_forces_inplace(nodes_pos, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, damping, nodes_forces):
+    # muscles_length holds the previous lengths on entry and the current ones on return.
+    # constants are cast to the array dtype so float32 arrays are not promoted to float64 arithmetic
+    real = nodes_pos.dtype.type
+    damping = real(damping)
+    nodes_forces[:] = 0.0
+    for i in range(len(muscles_strength)):
+        a = muscles_nodes[i][0]
+        b = muscles_nodes[i][1]
+        dx = nodes_pos[a][0] - nodes_pos[b][0]
+        dy = nodes_pos[a][1] - nodes_pos[b][1]
+        length = np.sqrt(dx * dx + dy * dy) + real(0.01)
+        force = ((start_muscles_length[i] - length) * muscles_strength[i] * real(4) + (muscles_length[i] - length) * damping) / length
+        nodes_forces[a][0] += dx * force
+        nodes_forces[a][1] += dy * force
+        nodes_forces[b][0] -= dx * force
+        nodes_forces[b][1] -= dy * force
+        muscles_length[i] = length
+
+@numba.njit
+@cc.export('move_inplace', 'void(f8[:, :], f8[:, :], f8[:], i4[:, :], f8[:], f8[:], f8, f8, i4, f8[:, :])')
+@cc.export('move_inplace_f4', 'void(f4[:, :], f4[:, :], f4[:], i4[:, :], f4[:], f4[:], f8, f8, i4, f4[:, :])')
+def move_inplace(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, fps, nodes_forces):
+    # same step as move, but every buffer is preallocated and updated in place
+    real = nodes_pos.dtype.type
+    G = real(G)
+    for _ in range(fps):
+        get_springs_forces_inplace(nodes_pos, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, damping, nodes_forces)
+        cen_y = real(0)
+        for i in range(len(nodes_pos)):
+            cen_y += nodes_pos[i][1]
+        cen_y /= real(len(nodes_pos))
+        for i in range(len(nodes_pos)):
+            nodes_forces[i][1] += G * (nodes_pos[i][1] - cen_y)
+            nodes_velocity[i][0] += nodes_forces[i][0] / real(60)
+            nodes_velocity[i][1] += nodes_forces[i][1] / real(60)
+            nodes_pos[i][0] += nodes_velocity[i][0] / real(60)
+            nodes_pos[i][1] += nodes_velocity[i][1] / real(60)
+
+@numba.njit
+@cc.export('recenter', 'void(f8[:, :], f8[:, :])')
+@cc.export('recenter_f4', 'void(f4[:, :], f4[:, :])')
+def recenter(nodes_pos, nodes_velocity):
+    # move into the centre-of-mass frame: zero mean position and zero mean velocity
+    cen_x = 0.0
+    cen_y = 0.0
+    v_x = 0.0
+    v_y = 0.0
+    for i in range(len(nodes_pos)):
+        cen_x += nodes_pos[i][0]
+        cen_y += nodes_pos[i][1]
+        v_x += nodes_velocity[i][0]
+        v_y += nodes_velocity[i][1]
+    n = len(nodes_pos)
+    for i in range(n):
+        nodes_pos[i][0] -= cen_x / n
+        nodes_pos[i][1] -= cen_y / n
+        nodes_velocity[i][0] -= v_x / n
+        nodes_velocity[i][1] -= v_y / n
+
+@numba.njit
+@cc.export('get_rotational_speed', 'f8(f8[:, :], f8[:, :])')
+@cc.export('get_rotational_speed_f4', 'f8(f4[:, :], f4[:, :])')
+def get_rotational_speed(nodes_pos, nodes_velocity):
+    # mean clockwise tangential speed about the origin, a node sitting on the origin adds nothing
+    q = 0.0
+    for i in range(len(nodes_pos)):
+        r = np.sqrt(nodes_pos[i][0] ** 2 + nodes_pos[i][1] ** 2)
+        if r > 0.0:
+            q -= (nodes_velocity[i][1] * nodes_pos[i][0] - nodes_velocity[i][0] * nodes_pos[i][1]) / r
+    return q / len(nodes_pos)
+
+@numba.njit
+@cc.export('get_energy', 'UniTuple(f8, 2)(f8[:, :], f8[:], f8[:], f8[:])')
+@cc.export('get_energy_f4', 'UniTuple(f8, 2)(f4[:, :], f4[:], f4[:], f4[:])')
+def get_energy(nodes_velocity, start_muscles_length, muscles_strength, muscles_length):
+    # unit node masses, the spring force 4 s (L0 - L) has energy 2 s (L0 - L)^2
+    kinetic = 0.0
+    for i in range(len(nodes_velocity)):
+        kinetic += 0.5 * (nodes_velocity[i][0] ** 2 + nodes_velocity[i][1] ** 2)
+    potential = 0.0
+    for i in range(len(muscles_strength)):
+        potential += 2 * muscles_strength[i] * (start_muscles_length[i] - muscles_length[i]) ** 2
+    return kinetic, potential
+
+@numba.njit
+@cc.export('move_sampled', 'i8(f8[:, :], f8[:, :], f8[:], i4[:, :], f8[:], f8[:], f8, f8, i4, f8[:, :], i4, f8[:, :], i8, f8)')
+@cc.export('move_sampled_f4', 'i8(f4[:, :], f4[:, :], f4[:], i4[:, :], f4[:], f4[:], f8, f8, i4, f4[:, :], i4, f8[:, :], i8, f8)')
+def move_sampled(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, fps, nodes_forces, sample_every, ring, ring_index, substep):
+    # every sample_every substeps the mesh is recentred and a diagnostics row goes into the ring buffer;
+    # returns the new ring index, row ring_index % len(ring) is the next one written.
+    # columns are substep, speed, torque, kinetic and potential energy (tide_sim.SAMPLE_*)
+    done = 0
+    while done < fps:
+        n = min(sample_every, fps - done)
+        move_inplace(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, n, nodes_forces)
+        done += n
+        recenter(nodes_pos, nodes_velocity)
+        q = get_rotational_speed(nodes_pos, nodes_velocity)
+        kinetic, potential = get_energy(nodes_velocity, start_muscles_length, muscles_strength, muscles_length)
+        row = ring[ring_index % len(ring)]
+        row[0] = substep + done
+        row[1] = q
+        row[2] = 0.0
+        if ring_index > 0:
+            last = ring[(ring_index - 1) % len(ring)]
+            row[2] = (last[1] - q) / (row[0] - last[0])
+        row[3] = kinetic
+        row[4] = potential
+        ring_index += 1
+    return ring_index
+
+# move and move_inplace advance 1/60 time units per substep; the kernels below take explicit times in the same units
+
+@numba.njit
+@cc.export('get_stable_timestep', 'f8(i4[:, :], f8[:], i4, f8, f8)')
+@cc.export('get_stable_timestep_f4', 'f8(i4[:, :], f4[:], i4, f8, f8)')
+def get_stable_timestep(muscles_nodes, muscles_strength, n_nodes, G, damping):
+    # Gershgorin bound on the stiffness and damping matrices (unit masses): each spring adds its 4 s,
+    # and damping / 60, to the diagonal and the off-diagonal of both its nodes
+    stiffness = np.zeros(n_nodes)
+    for i in range(len(muscles_strength)):
+        stiffness[muscles_nodes[i][0]] += 8 * muscles_strength[i]
+        stiffness[muscles_nodes[i][1]] += 8 * muscles_strength[i]
+    friction = np.zeros(n_nodes)
+    for i in range(len(muscles_strength)):
+        friction[muscles_nodes[i][0]] += 2 * abs(damping) / 60
+        friction[muscles_nodes[i][1]] += 2 * abs(damping) / 60
+    # leapfrog is stable up to 2 / sqrt(k) for an undamped oscillator, the friction term keeps the
+    # explicit damping inside its own 2 / c limit
+    return 2 / (np.sqrt(np.max(stiffness) + abs(G)) + np.max(friction))
+
+@numba.njit
+@cc.export('get_springs_forces_rate', 'void(f8[:, :], f8[:, :], f8[:], i4[:, :], f8[:], f8[:], f8, f8, f8[:, :])')
+@cc.export('get_springs_forces_rate_f4', 'void(f4[:, :], f4[:, :], f4[:], i4[:, :], f4[:], f4[:], f8, f8, f4[:, :])')
+def get_springs_forces_rate(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, nodes_forces):
+    # spring, damping and G forces for a given state; the damping force is damping / 60 * dL/dt, which is
+    # what (last_length - length) * damping approximates at the fixed 1/60 step
+    real = nodes_pos.dtype.type
+    G = real(G)
+    damping = real(damping)
+    nodes_forces[:] = 0.0
+    for i in range(len(muscles_strength)):
+        a = muscles_nodes[i][0]
+        b = muscles_nodes[i][1]
+        dx = nodes_pos[a][0] - nodes_pos[b][0]
+        dy = nodes_pos[a][1] - nodes_pos[b][1]
+        length = np.sqrt(dx * dx + dy * dy) + real(0.01)
+        rate = (dx * (nodes_velocity[a][0] - nodes_velocity[b][0]) + dy * (nodes_velocity[a][1] - nodes_velocity[b][1])) / length
+        force = ((start_muscles_length[i] - length) * muscles_strength[i] * real(4) - rate * damping / real(60)) / length
+        nodes_forces[a][0] += dx * force
+        nodes_forces[a][1] += dy * force
+        nodes_forces[b][0] -= dx * force
+        nodes_forces[b][1] -= dy * force
+        muscles_length[i] = length
+    cen_y = real(0)
+    for i in range(len(nodes_pos)):
+        cen_y += nodes_pos[i][1]
+    cen_y /= real(len(nodes_pos))
+    for i in range(len(nodes_pos)):
+        nodes_forces[i][1] += G * (nodes_pos[i][1] - cen_y)
+
+@numba.njit
+@cc.export('get_max_strain_rate', 'f8(f8[:, :], f8[:, :], f8[:], i4[:, :])')
+@cc.export('get_max_strain_rate_f4', 'f8(f4[:, :], f4[:, :], f4[:], i4[:, :])')
+def get_max_strain_rate(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes):
+    rate = 0.0
+    for i in range(len(muscles_nodes)):
+        a = muscles_nodes[i][0]
+        b = muscles_nodes[i][1]
+        dx = nodes_pos[a][0] - nodes_pos[b][0]
+        dy = nodes_pos[a][1] - nodes_pos[b][1]
+        length = np.sqrt(dx ** 2 + dy ** 2) + 0.01
+        dl = (dx * (nodes_velocity[a][0] - nodes_velocity[b][0]) + dy * (nodes_velocity[a][1] - nodes_velocity[b][1])) / length
+        rate = max(rate, abs(dl) / start_muscles_length[i])
+    return rate
+
+@numba.njit
+@cc.export('move_verlet', 'i8(f8[:, :], f8[:, :], f8[:], i4[:, :], f8[:], f8[:], f8, f8, f8, f8, f8, f8[:, :])')
+@cc.export('move_verlet_f4', 'i8(f4[:, :], f4[:, :], f4[:], i4[:, :], f4[:], f4[:], f8, f8, f8, f8, f8, f4[:, :])')
+def move_verlet(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, duration, dt, max_strain, nodes_forces):
+    # kick-drift-kick leapfrog over duration time units (fps substeps of move cover fps / 60) with steps of at most dt.
+    # max_strain > 0 turns on adaptive steps, no spring may change its length by more than max_strain
+    # of its rest length in one step; returns the number of steps taken
+    real = nodes_pos.dtype.type
+    get_springs_forces_rate(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, nodes_forces)
+    t = 0.0
+    steps = 0
+    while t < duration:
+        h = min(dt, duration - t)
+        if max_strain > 0:
+            rate = get_max_strain_rate(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes)
+            if rate * h > max_strain:
+                h = max_strain / rate
+        step = real(h)
+        half = real(h / 2)
+        for i in range(len(nodes_pos)):
+            nodes_velocity[i][0] += nodes_forces[i][0] * half
+            nodes_velocity[i][1] += nodes_forces[i][1] * half
+            nodes_pos[i][0] += nodes_velocity[i][0] * step
+            nodes_pos[i][1] += nodes_velocity[i][1] * step
+        get_springs_forces_rate(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, nodes_forces)
+        for i in range(len(nodes_pos)):
+            nodes_velocity[i][0] += nodes_forces[i][0] * half
+            nodes_velocity[i][1] += nodes_forces[i][1] * half
+        t += h
+        steps += 1
+    return steps
 
 if __name__ == "__main__":
     cc.compile()
\ No newline at end of file
@@ -0,0 +1,84 @@
+import time
+import argparse
+
+import numpy as np
+
+import tide_sim
+import tide_sim_mesh
+import tide_sim_checkpoint
+
+def run(body, fps=2**10, max_blocks=None, threshold=1.0, output=None, report_every=0, sample_every=None, integrator='euler', dt=None, max_strain=0.0,
+        checkpoint=None, checkpoint_every=0, setup=True):
+    # same stepping and diagnostics as Body.show_sim, with no drawing and no frame cap;
+    # sample_every=None samples once per block like show_sim, the verlet integrator samples once per block.
+    # with a checkpoint directory the state is saved every checkpoint_every blocks and when the run ends
+    settings = dict(fps=fps, threshold=threshold, sample_every=sample_every, integrator=integrator, dt=dt, max_strain=max_strain)
+    if setup:
+        body.setup_sim()
+    blocks = 0
+    start = time.perf_counter()
+    while max_blocks is None or blocks < max_blocks:
+        if integrator == 'verlet':
+            body.step_verlet(fps, dt, max_strain)
+            body.record_frame(fps)
+        else:
+            body.step_sampled(fps, sample_every or fps)
+        blocks += 1
+        if report_every and blocks % report_every == 0:
+            print(f'{body.x[-1]} substeps, speed {body.data[-1]:.4f}, {body.x[-1] / (time.perf_counter() - start):.0f} substeps/s')
+        if checkpoint is not None and checkpoint_every and blocks % checkpoint_every == 0:
+            tide_sim_checkpoint.checkpoint(body, checkpoint, settings)
+        if body.data[-1] < threshold:
+            break
+
+    if checkpoint is not None:
+        tide_sim_checkpoint.checkpoint(body, checkpoint, settings)
+    if output is not None:
+        save(body, output)
+    return body
+
+def resume(checkpoint, max_blocks=None, output=None, report_every=0, checkpoint_every=0):
+    # carries on from the last snapshot with the settings the run was started with
+    body, settings = tide_sim_checkpoint.load(checkpoint)
+    return run(body, max_blocks=max_blocks, output=output, report_every=report_every, checkpoint=checkpoint, checkpoint_every=checkpoint_every, setup=False, **settings)
+
+def save(body, output):
+    np.savez(output, x=np.array(body.x), data=np.array(body.data), angle_data=np.array(body.angle_data), energy_data=np.array(body.energy_data))
+
+def main():
+    parser = argparse.ArgumentParser(description='run the spring-mass despin experiment without a window')
+    parser.add_argument('--fps', type=int, default=2**10, help='substeps per recorded frame')
+    parser.add_argument('--max-blocks', type=int)
+    parser.add_argument('--threshold', type=float, default=1.0, help='stop once the mean rotational speed drops below this')
+    parser.add_argument('--output', default='tide_sim_run.npz')
+    parser.add_argument('--report-every', type=int, default=100)
+    parser.add_argument('--sample-every', type=int, help='substeps between diagnostics samples, defaults to --fps')
+    parser.add_argument('--integrator', choices=['euler', 'verlet'], default='euler')
+    parser.add_argument('--dt', type=float, help='largest verlet step, defaults to half the stability limit (euler uses 1/60)')
+    parser.add_argument('--max-strain', type=float, default=0.0, help='adaptive verlet steps: largest change in spring length per step, as a fraction of its rest length')
+    parser.add_argument('--rings', type=int, help='use a triangulated disk with this many rings instead of the legacy two-ring mesh')
+    parser.add_argument('--dtype', choices=['f8', 'f4'], default='f8', help='precision of the engine state and kernels')
+    parser.add_argument('--checkpoint', help='directory to checkpoint the run into')
+    parser.add_argument('--checkpoint-every', type=int, default=100, help='blocks between checkpoints')
+    parser.add_argument('--resume', help='checkpoint directory to carry on from, the run settings come from the checkpoint')
+    args = parser.parse_args()
+
+    if args.resume:
+        body = resume(args.resume, args.max_blocks, args.output, args.report_every, args.checkpoint_every)
+        print(body.x[-1], body.data[-1])
+        return
+
+    body = tide_sim.Body()
+    body.dtype = args.dtype
+    if args.rings:
+        # stiffness scaled with the node count against the 81-node legacy mesh
+        n_nodes = 3 * args.rings * (args.rings + 1) + 1
+        body.nodes_pos, body.springs_nodes, body.springs_s = tide_sim_mesh.triangulated_disk(args.rings, body.r, 0.1 * n_nodes / 81)
+    else:
+        tide_sim.build_disk(body)
+
+    body = run(body, args.fps, args.max_blocks, args.threshold, args.output, args.report_every, args.sample_every, args.integrator, args.dt, args.max_strain, args.checkpoint, args.checkpoint_every)
+    print(body.x[-1], body.data[-1])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import numpy as np
+
+# disk meshes for tide_sim as contiguous arrays: node 0 is the centre, rings follow from the inside out.
+# every builder returns nodes_pos (f8, n x 2), springs_nodes (i4, m x 2) and springs_s (f8, m)
+
+def layer_values(value, n_layers):
+    values = np.broadcast_to(np.asarray(value, 'f8'), (n_layers,))
+    return np.ascontiguousarray(values)
+
+def ring_nodes(n, radius):
+    angles = 2 * np.arange(n) * np.pi / n
+    return np.stack([radius * np.cos(angles), radius * np.sin(angles)], axis=1)
+
+def ring_disk(ring_counts, ring_radii, stiffness=0.1, ring_springs=2):
+    # each node is tied to the nearest node of the ring inside it and to that node's two neighbours (just the
+    # centre for the first ring), then to its neighbours on its own ring. ring_springs=2 keeps the duplicated
+    # ring edges and the exact spring order of the original tide_sim.main mesh, ring_springs=1 drops the duplicates.
+    # stiffness is one value or one per ring, it applies to every spring that ends on that ring
+    ring_counts = np.asarray(ring_counts, np.int64)
+    stiffness = layer_values(stiffness, len(ring_counts))
+    nodes = [np.zeros((1, 2))]
+    springs = []
+    strengths = []
+    n_in = 1
+    first_in = 0
+    first = 1
+    for k, n in enumerate(ring_counts):
+        nodes.append(ring_nodes(n, ring_radii[k]))
+        i = np.arange(n)
+        j0 = (2 * i * n_in + n) // (2 * n)
+        if n_in == 1:
+            inner = (j0 % n_in)[:, None]
+        else:
+            inner = np.stack([j0 % n_in, (j0 + 1) % n_in, (j0 - 1) % n_in], axis=1)
+        if ring_springs == 2:
+            ring = np.stack([(i - 1) % n, (i + 1) % n], axis=1)
+        else:
+            ring = ((i + 1) % n)[:, None]
+        others = np.concatenate([inner + first_in, ring + first], axis=1)
+        pairs = np.stack([others, np.broadcast_to((i + first)[:, None], others.shape)], axis=2)
+        springs.append(pairs.reshape(-1, 2))
+        strengths.append(np.full(len(springs[-1]), stiffness[k]))
+        n_in = n
+        first_in = first
+        first += n
+    return np.concatenate(nodes), np.concatenate(springs).astype('i4'), np.concatenate(strengths)
+
+def triangulated_disk(n_rings, radius, stiffness=0.1):
+    # rings of 6k nodes at evenly spaced radii, so every triangle is close to equilateral. each node is tied to the
+    # one or two inner nodes bracketing its angle and to the next node on its ring. the engine gives every node
+    # unit mass, so a finer mesh needs proportionally stiffer springs to behave like the same body
+    stiffness = layer_values(stiffness, n_rings)
+    nodes = [np.zeros((1, 2))]
+    springs = []
+    strengths = []
+    n_in = 1
+    first_in = 0
+    first = 1
+    for k in range(1, n_rings + 1):
+        n = 6 * k
+        nodes.append(ring_nodes(n, radius * k / n_rings))
+        i = np.arange(n)
+        low = (i * n_in) // n
+        high = -(-i * n_in // n) % n_in
+        both = high != low
+        outer = np.concatenate([i, i[both], i]) + first
+        other = np.concatenate([low + first_in, high[both] + first_in, (i + 1) % n + first])
+        order = np.argsort(np.concatenate([3 * i, 3 * i[both] + 1, 3 * i + 2]), kind='stable')
+        springs.append(np.stack([other[order], outer[order]], axis=1))
+        strengths.append(np.full(len(order), stiffness[k - 1]))
+        n_in = n
+        first_in = first
+        first += n
+    return np.concatenate(nodes), np.concatenate(springs).astype('i4'), np.concatenate(strengths)
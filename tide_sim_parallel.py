@@ -0,0 +1,65 @@
+import numpy as np
+import numba
+
+# JIT-only parallel kernels for tide_sim_eng. numba's AOT compiler does not support parallel=True, and the
+# extension built from tide_sim_eng.py replaces that module on import, so these live in their own module
+
+@numba.njit
+def build_incidence(muscles_nodes, n_nodes):
+    # CSR node -> spring incidence, the sign says whether the spring pushes or pulls on the node
+    indptr = np.zeros(n_nodes + 1, np.int64)
+    for i in range(len(muscles_nodes)):
+        indptr[muscles_nodes[i][0] + 1] += 1
+        indptr[muscles_nodes[i][1] + 1] += 1
+    for i in range(n_nodes):
+        indptr[i + 1] += indptr[i]
+    fill = indptr[:-1].copy()
+    springs = np.empty(indptr[-1], np.int64)
+    signs = np.empty(indptr[-1])
+    for i in range(len(muscles_nodes)):
+        a = muscles_nodes[i][0]
+        b = muscles_nodes[i][1]
+        springs[fill[a]] = i
+        signs[fill[a]] = 1.0
+        fill[a] += 1
+        springs[fill[b]] = i
+        signs[fill[b]] = -1.0
+        fill[b] += 1
+    return indptr, springs, signs
+
+@numba.njit(parallel=True)
+def get_springs_forces_parallel(nodes_pos, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, damping, springs_forces, nodes_forces, indptr, springs, signs):
+    # each spring writes only its own force, then each node gathers from its springs, so there are no write races
+    for i in numba.prange(len(muscles_strength)):
+        a = muscles_nodes[i][0]
+        b = muscles_nodes[i][1]
+        dx = nodes_pos[a][0] - nodes_pos[b][0]
+        dy = nodes_pos[a][1] - nodes_pos[b][1]
+        length = np.sqrt(dx ** 2 + dy ** 2) + 0.01
+        force = ((start_muscles_length[i] - length) * muscles_strength[i] * 4 + (muscles_length[i] - length) * damping) / length
+        springs_forces[i][0] = dx * force
+        springs_forces[i][1] = dy * force
+        muscles_length[i] = length
+    for n in numba.prange(len(nodes_pos)):
+        fx = 0.0
+        fy = 0.0
+        for j in range(indptr[n], indptr[n + 1]):
+            fx += signs[j] * springs_forces[springs[j]][0]
+            fy += signs[j] * springs_forces[springs[j]][1]
+        nodes_forces[n][0] = fx
+        nodes_forces[n][1] = fy
+
+@numba.njit(parallel=True)
+def move_parallel(nodes_pos, nodes_velocity, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, G, damping, fps, nodes_forces, springs_forces, indptr, springs, signs):
+    for _ in range(fps):
+        get_springs_forces_parallel(nodes_pos, start_muscles_length, muscles_nodes, muscles_strength, muscles_length, damping, springs_forces, nodes_forces, indptr, springs, signs)
+        cen_y = 0.0
+        for i in numba.prange(len(nodes_pos)):
+            cen_y += nodes_pos[i][1]
+        cen_y /= len(nodes_pos)
+        for i in numba.prange(len(nodes_pos)):
+            nodes_forces[i][1] += G * (nodes_pos[i][1] - cen_y)
+            nodes_velocity[i][0] += nodes_forces[i][0] / 60
+            nodes_velocity[i][1] += nodes_forces[i][1] / 60
+            nodes_pos[i][0] += nodes_velocity[i][0] / 60
+            nodes_pos[i][1] += nodes_velocity[i][1] / 60
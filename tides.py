@@ -1,5 +1,7 @@
+import collections
+import concurrent.futures
+
 import numpy as np
-import matplotlib.pyplot as plt
 import numba as nb
 import scipy
 import scipy.integrate
@@ -9,18 +11,33 @@ G = 6.67408 * 10**-11
 def period_to_omega(period):
   return 2 * np.pi / (period * 24 * 60 * 60)
 
+def keplers_third_law(a, body1, body2):
+  return np.sqrt(G * (body1.mass + body2.mass) / (a ** 3))
+
+# body1 is the body being despun, body2 raises the tide on it
+def change_in_a(w, a, body1, body2):
+  return np.sign(w - keplers_third_law(a, body1, body2)) * (3 * body1.k_2 / body1.Q) * (body2.mass / body1.mass) * (body1.radius / a) ** 5 * keplers_third_law(a, body1, body2) * a
+
+def change_in_omega(w, a, body1, body2):
+  return -np.sign(w - keplers_third_law(a, body1, body2)) * (3 * body1.k_2 / (2 * body1.alpha * body1.Q)) * (body2.mass ** 2 / (body1.mass * (body1.mass + body2.mass))) * (body1.radius / a) ** 3 * keplers_third_law(a, body1, body2) ** 2
+
 def calculated_tidal_despin_change(xi, y, system, body):
+  # pure: reads only the bodies of the system, so one System can be solved from many threads
   w, a = y
-  system.a = a
-  if body == 's':
-    system.omega_s = w
-    dw = system.change_in_omega_s()
-    da = system.change_in_a_s()
-  elif body == 'p':
-    system.omega_p = w
-    dw = system.change_in_omega_p()
-    da = system.change_in_a_p()
-  return np.array([dw, da]) * 24 * 60 * 60 * 365.25
+  body1, body2 = system.despin_bodies(body)
+  return np.array([change_in_omega(w, a, body1, body2), change_in_a(w, a, body1, body2)]) * 24 * 60 * 60 * 365.25
+
+DespinSolution = collections.namedtuple('DespinSolution', ['despin_time', 'years', 'w', 'sol'])
+
+def solve_systems(systems, body='s', method='event', max_workers=None, **kwargs):
+  # solve_ivp holds the GIL for most of its work, so the speedup is largest on free-threaded builds
+  def solve(system):
+    if method == 'event':
+      return system.solve_event(body, **kwargs)
+    return system.solve(body, **kwargs)
+
+  with concurrent.futures.ThreadPoolExecutor(max_workers) as pool:
+    return list(pool.map(solve, systems))
 
 class Body:
   def __init__(self, radius, mass, k_2 = 0.1, Q = 100, alpha = 0.4):
@@ -58,17 +75,29 @@ class System:
   def keplers_third_law(self):
     return np.sqrt(G * (self.satellite.mass + self.host.mass) / (self.a ** 3))
 
+  def despin_bodies(self, body):
+    if body == 's':
+      return self.satellite, self.host
+    elif body == 'p':
+      return self.host, self.satellite
+
+  def start_omega(self, body):
+    if body == 's':
+      return self.start_omega_s
+    elif body == 'p':
+      return self.start_omega_p
+
   def change_in_a_s(self):
-    return np.sign(self.omega_s - self.keplers_third_law()) * (3 * self.satellite.k_2 / self.satellite.Q) * (self.host.mass / self.satellite.mass) * (self.satellite.radius / self.a) ** 5 * self.keplers_third_law() * self.a
+    return change_in_a(self.omega_s, self.a, self.satellite, self.host)
 
   def change_in_a_p(self):
-    return np.sign(self.omega_p - self.keplers_third_law()) * (3 * self.host.k_2 / self.host.Q) * (self.satellite.mass / self.host.mass) * (self.host.radius / self.a) ** 5 * self.keplers_third_law() * self.a
+    return change_in_a(self.omega_p, self.a, self.host, self.satellite)
 
   def change_in_omega_s(self):
-    return -np.sign(self.omega_s - self.keplers_third_law()) * (3 * self.satellite.k_2 / (2 * self.satellite.alpha * self.satellite.Q)) * (self.host.mass ** 2 / (self.satellite.mass * (self.host.mass + self.satellite.mass))) * (self.satellite.radius / self.a) ** 3 * self.keplers_third_law() ** 2
+    return change_in_omega(self.omega_s, self.a, self.satellite, self.host)
 
   def change_in_omega_p(self):
-    return -np.sign(self.omega_p - self.keplers_third_law()) * (3 * self.host.k_2 / (2 * self.host.alpha * self.host.Q)) * (self.satellite.mass ** 2 / (self.host.mass * (self.host.mass + self.satellite.mass))) * (self.host.radius / self.a) ** 3 * self.keplers_third_law() ** 2
+    return change_in_omega(self.omega_p, self.a, self.host, self.satellite)
 
   def step_forward(self, time, body):
     if body == 's':
@@ -79,52 +108,65 @@ class System:
       self.a += time * self.change_in_a_p()
     
   def calculated_tidal_despin_scipy_helper(self, body, xi_max, steps):
-    self.reset()
-    self.reset()
-    if body == 's':
-      initial_conditions = np.array([self.start_omega_s, self.start_a])
-
-    elif body == 'p':
-      initial_conditions = np.array([self.start_omega_p, self.start_a])
-    
+    initial_conditions = np.array([self.start_omega(body), self.start_a])
     return scipy.integrate.solve_ivp(calculated_tidal_despin_change, [0, xi_max], initial_conditions, t_eval=np.linspace(0, xi_max,steps), args=(self, body,), method='RK45')
 
-  def calculated_tidal_despin_scipy(self, body, xi_max=100, steps=10):
+  def solve(self, body, xi_max=100, steps=10):
+    # state in, state out: nothing is written to the instance
+    lock = (self.start_omega(body) - self.start_n) / 1000
     for _ in range(1000):
       sol = self.calculated_tidal_despin_scipy_helper(body, xi_max, steps)
-
-      if body == 's':
-        if min(sol.y[0] - self.keplers_third_law()) < (self.start_omega_s - self.start_n) / 1000:
-          break
-    
-      if body == 'p':
-        if min(sol.y[0] - self.keplers_third_law()) < (self.start_omega_p - self.start_n) / 1000:
-          break
-      
+      if min(sol.y[0] - keplers_third_law(sol.y[1], self.host, self.satellite)) < lock:
+        break
       xi_max *= 1.5
 
     sol = self.calculated_tidal_despin_scipy_helper(body, xi_max, steps * 10)
 
-    years_data = []
-    w_data = []
-
-    for i, w in enumerate(sol.y[0]):
-      if w - self.keplers_third_law() < (self.start_omega_p - self.start_n) / 1000:
-        break
-      w_data.append(w)
-      years_data.append(sol.t[i])
-    
+    spinning = sol.y[0] - keplers_third_law(sol.y[1], self.host, self.satellite) >= lock
+    end = np.argmin(spinning) if not spinning.all() else len(spinning)
+    years_data = list(sol.t[:end])
+    w_data = list(sol.y[0][:end])
+    return DespinSolution(years_data[-1] if years_data else 0.0, years_data, w_data, sol)
+
+  def solve_event(self, body, rtol=1e-6):
+    start_w = self.start_omega(body)
+    lock = (start_w - self.start_n) / 500
+    if lock <= 0:
+      # already at or below the orbital rate, as in calculated_tidal_despin
+      return DespinSolution(0.0, [0.0], [start_w], None)
+
+    def lock_event(xi, y, system, body):
+      return y[0] - keplers_third_law(y[1], system.host, system.satellite) - lock
+    lock_event.terminal = True
+    lock_event.direction = -1
+
+    # one solve with unbounded adaptive steps instead of re-solving with a growing xi_max
+    atol = [rtol * abs(start_w - self.start_n), rtol * self.start_a]
+    sol = scipy.integrate.solve_ivp(calculated_tidal_despin_change, [0, 10.0**100], np.array([start_w, self.start_a]), args=(self, body,), events=lock_event, rtol=rtol, atol=atol, method='RK45')
+    return DespinSolution(sol.t[-1], list(sol.t), list(sol.y[0]), sol)
+
+  def store(self, body, solution):
     if body == 's':
-      self.sol[1] = sol
-      self.s_despin_data[0] = years_data.copy()
-      self.s_despin_data[1] = w_data.copy()
+      self.sol[1] = solution.sol
+      self.s_despin = solution.despin_time
+      self.s_despin_data[0] = solution.years
+      self.s_despin_data[1] = solution.w
 
     elif body == 'p':
-      self.sol[0] = sol
-      self.p_despin_data[0] = years_data.copy()
-      self.p_despin_data[1] = w_data.copy()
-      
+      self.sol[0] = solution.sol
+      self.p_despin = solution.despin_time
+      self.p_despin_data[0] = solution.years
+      self.p_despin_data[1] = solution.w
+
+  def calculated_tidal_despin_scipy(self, body, xi_max=100, steps=10):
+    self.store(body, self.solve(body, xi_max, steps))
+
+  def calculated_tidal_despin_scipy_event(self, body, rtol=1e-6):
+    self.store(body, self.solve_event(body, rtol))
+
   def graph(self, body):
+    import matplotlib.pyplot as plt
+
     if body == 's' or body == 'all':
       plt.plot(self.s_despin_data[0], self.s_despin_data[1], label="s")
     if body == 'p' or body == 'all':
@@ -175,79 +217,80 @@ pluto = Body(1137 * 10**3, 1.27 * 10**22, 0.06, 100)
 charon = Body(586 * 10**3, 1.5 * 10**21, 0.006, 100)
 
 
-# sun_mercury = System(sun, mercury, 47.8 * 10**9)
-# sun_mercury.calculated_tidal_despin('s')
-# print("sun_mercury")
-# print(sun_mercury)
-
-# sun_venus = System(sun, venus, 108.2 * 10**9)
-# sun_venus.calculated_tidal_despin('s')
-# print("sun_venus")
-# print(sun_venus)
-
-# sun_earth = System(sun, earth, 149.6 * 10**9)
-# sun_earth.calculated_tidal_despin('s')
-# print("sun_earth")
-# print(sun_earth)
-
-# sun_mars = System(sun, mars, 227.9 * 10**9)
-# sun_mars.calculated_tidal_despin('s')
-# print("sun_mars")
-# print(sun_mars)
-
-# earth_moon = System(earth, moon, 384 * 10**6)
-# earth_moon.calculated_tidal_despin('all')
-# print("earth_moon")
-# print(earth_moon)
-
-# mars_phobos = System(mars, phobos, 9.3 * 10**6)
-# mars_phobos.calculated_tidal_despin('s')
-# print("mars_phobos")
-# print(mars_phobos)
-
-# jupiter_io = System(jupiter, io, 421 * 10**6)
-# jupiter_io.calculated_tidal_despin('s')
-# print("jupiter_io")
-# print(jupiter_io)
-
-# jupiter_europa = System(jupiter, europa, 670 * 10**6)
-# jupiter_europa.calculated_tidal_despin('s')
-# print("jupiter_europa")
-# print(jupiter_europa)
-
-# saturn_hyperion = System(saturn, hyperion, 1471 * 10**6)
-# saturn_hyperion.calculated_tidal_despin('s')
-# print("saturn_hyperion")
-# print(saturn_hyperion)
-
-# uranus_miranda = System(uranus, miranda, 129 * 10**6)
-# uranus_miranda.calculated_tidal_despin('s')
-# print("uranus_miranda")
-# print(uranus_miranda)
-
-# uranus_ariel = System(uranus, ariel, 191 * 10**6)
-# uranus_ariel.calculated_tidal_despin('s')
-# print("uranus_ariel")
-# print(uranus_ariel)
-
-# neptune_triton = System(neptune, triton, 355 * 10**6)
-# neptune_triton.calculated_tidal_despin('s')
-# print("neptune_triton")
-# print(neptune_triton)
-
-# pluto_charon = System(pluto, charon, 19 * 10**6)
-# pluto_charon.calculated_tidal_despin('all')
-# print("pluto_charon")
-# print(pluto_charon)
-
-# mars_phobos.graph('all')
-# mars_phobos.reset()
-# print(mars_phobos.change_in_a_p())
-# print(mars_phobos.change_in_a_s())
-
-sun_earth = System(sun, earth, 149.6 * 10**9)
-sun_earth.calculated_tidal_despin_scipy('s', 100, 10000)
-print("sun_earth")
-print(sun_earth)
-
-sun_earth.graph('all')
\ No newline at end of file
+if __name__ == "__main__":
+  # sun_mercury = System(sun, mercury, 47.8 * 10**9)
+  # sun_mercury.calculated_tidal_despin('s')
+  # print("sun_mercury")
+  # print(sun_mercury)
+
+  # sun_venus = System(sun, venus, 108.2 * 10**9)
+  # sun_venus.calculated_tidal_despin('s')
+  # print("sun_venus")
+  # print(sun_venus)
+
+  # sun_earth = System(sun, earth, 149.6 * 10**9)
+  # sun_earth.calculated_tidal_despin('s')
+  # print("sun_earth")
+  # print(sun_earth)
+
+  # sun_mars = System(sun, mars, 227.9 * 10**9)
+  # sun_mars.calculated_tidal_despin('s')
+  # print("sun_mars")
+  # print(sun_mars)
+
+  # earth_moon = System(earth, moon, 384 * 10**6)
+  # earth_moon.calculated_tidal_despin('all')
+  # print("earth_moon")
+  # print(earth_moon)
+
+  # mars_phobos = System(mars, phobos, 9.3 * 10**6)
+  # mars_phobos.calculated_tidal_despin('s')
+  # print("mars_phobos")
+  # print(mars_phobos)
+
+  # jupiter_io = System(jupiter, io, 421 * 10**6)
+  # jupiter_io.calculated_tidal_despin('s')
+  # print("jupiter_io")
+  # print(jupiter_io)
+
+  # jupiter_europa = System(jupiter, europa, 670 * 10**6)
+  # jupiter_europa.calculated_tidal_despin('s')
+  # print("jupiter_europa")
+  # print(jupiter_europa)
+
+  # saturn_hyperion = System(saturn, hyperion, 1471 * 10**6)
+  # saturn_hyperion.calculated_tidal_despin('s')
+  # print("saturn_hyperion")
+  # print(saturn_hyperion)
+
+  # uranus_miranda = System(uranus, miranda, 129 * 10**6)
+  # uranus_miranda.calculated_tidal_despin('s')
+  # print("uranus_miranda")
+  # print(uranus_miranda)
+
+  # uranus_ariel = System(uranus, ariel, 191 * 10**6)
+  # uranus_ariel.calculated_tidal_despin('s')
+  # print("uranus_ariel")
+  # print(uranus_ariel)
+
+  # neptune_triton = System(neptune, triton, 355 * 10**6)
+  # neptune_triton.calculated_tidal_despin('s')
+  # print("neptune_triton")
+  # print(neptune_triton)
+
+  # pluto_charon = System(pluto, charon, 19 * 10**6)
+  # pluto_charon.calculated_tidal_despin('all')
+  # print("pluto_charon")
+  # print(pluto_charon)
+
+  # mars_phobos.graph('all')
+  # mars_phobos.reset()
+  # print(mars_phobos.change_in_a_p())
+  # print(mars_phobos.change_in_a_s())
+
+  sun_earth = System(sun, earth, 149.6 * 10**9)
+  sun_earth.calculated_tidal_despin_scipy('s', 100, 10000)
+  print("sun_earth")
+  print(sun_earth)
+
+  sun_earth.graph('all')
\ No newline at end of file